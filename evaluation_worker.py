@@ -0,0 +1,403 @@
+"""
+Evaluation Worker - Claim pending evaluation jobs through expiring leases
+
+Any number of worker processes, on one host or several, pull prompts whose
+evaluation is pending. A worker claims a job by atomically moving it to
+'running' with its own ID and a lease expiry, keeps the lease alive with a
+heartbeat while the judge runs, and marks it 'done' or 'failed'. If a worker
+dies its lease expires and another worker reclaims the job, so evaluation is
+at-least-once.
+
+The Supabase queue uses these columns on the prompts table:
+
+    ALTER TABLE prompts
+        ADD COLUMN eval_status TEXT,              -- pending / running / done / failed
+        ADD COLUMN eval_lease_owner TEXT,
+        ADD COLUMN eval_lease_expires_at TIMESTAMPTZ,
+        ADD COLUMN eval_attempts INTEGER DEFAULT 0,
+        ADD COLUMN eval_error TEXT;
+
+A failed job goes back to pending with eval_lease_expires_at set to its
+retry time, so no worker claims it again until its backoff has passed.
+
+SQLiteJobQueue implements the same operations on a local file so workers can
+be exercised without a database.
+"""
+
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _utc_iso(offset_seconds=0):
+    return (datetime.now(timezone.utc) + timedelta(seconds=offset_seconds)).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+class SupabaseJobQueue:
+    def __init__(self, supabase, candidates=5):
+        self.supabase = supabase
+        self.candidates = candidates
+
+    def _claimable_filter(self, now):
+        # The timestamp is quoted because ':' and '.' are reserved in PostgREST logic filters
+        # Pending jobs with an expiry are backing off after a failure, running ones hold a lease
+        return (f'and(eval_status.eq.pending,eval_lease_expires_at.is.null),'
+                f'and(eval_status.in.(pending,running),eval_lease_expires_at.lt."{now}")')
+
+    def enqueue(self, prompt_ids):
+        """Mark prompts as pending evaluation"""
+        for prompt_id in prompt_ids:
+            self.supabase.table("prompts").update({
+                "eval_status": "pending",
+                "eval_lease_owner": None,
+                "eval_lease_expires_at": None,
+                "eval_attempts": 0,
+                "eval_error": None
+            }).eq("id", prompt_id).execute()
+
+    def claim(self, worker_id, lease_seconds):
+        """Claim the oldest pending or expired job; returns {'id', 'attempts'} or None"""
+        now = _utc_iso()
+        result = self.supabase.table("prompts")\
+            .select("id, eval_attempts")\
+            .or_(self._claimable_filter(now))\
+            .order("created_at")\
+            .limit(self.candidates)\
+            .execute()
+
+        for candidate in result.data:
+            attempts = (candidate.get('eval_attempts') or 0) + 1
+            # The filter is re-checked inside the UPDATE, so only one worker wins the row
+            claimed = self.supabase.table("prompts")\
+                .update({
+                    "eval_status": "running",
+                    "eval_lease_owner": worker_id,
+                    "eval_lease_expires_at": _utc_iso(lease_seconds),
+                    "eval_attempts": attempts
+                })\
+                .eq("id", candidate['id'])\
+                .or_(self._claimable_filter(now))\
+                .execute()
+            if claimed.data:
+                return {'id': candidate['id'], 'attempts': attempts}
+
+        return None
+
+    def heartbeat(self, job_id, worker_id, lease_seconds):
+        """Extend a lease; False means the lease was lost to another worker"""
+        result = self.supabase.table("prompts")\
+            .update({"eval_lease_expires_at": _utc_iso(lease_seconds)})\
+            .eq("id", job_id)\
+            .eq("eval_status", "running")\
+            .eq("eval_lease_owner", worker_id)\
+            .execute()
+        return bool(result.data)
+
+    def complete(self, job_id, worker_id):
+        result = self.supabase.table("prompts")\
+            .update({"eval_status": "done", "eval_lease_owner": None, "eval_lease_expires_at": None, "eval_error": None})\
+            .eq("id", job_id)\
+            .eq("eval_lease_owner", worker_id)\
+            .execute()
+        return bool(result.data)
+
+    def fail(self, job_id, worker_id, error, retry, retry_delay=0):
+        """Release a job back to pending, claimable after retry_delay seconds, or mark it failed"""
+        result = self.supabase.table("prompts")\
+            .update({
+                "eval_status": "pending" if retry else "failed",
+                "eval_lease_owner": None,
+                "eval_lease_expires_at": _utc_iso(retry_delay) if retry and retry_delay else None,
+                "eval_error": error
+            })\
+            .eq("id", job_id)\
+            .eq("eval_lease_owner", worker_id)\
+            .execute()
+        return bool(result.data)
+
+
+class SQLiteJobQueue:
+    def __init__(self, path):
+        self.path = path
+        # One connection per process; a busy timeout lets concurrent workers wait their turn
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                eval_status TEXT NOT NULL DEFAULT 'pending',
+                eval_lease_owner TEXT,
+                eval_lease_expires_at REAL,
+                eval_attempts INTEGER NOT NULL DEFAULT 0,
+                eval_error TEXT,
+                created_at REAL NOT NULL
+            )
+        """)
+
+    def enqueue(self, prompt_ids):
+        now = time.time()
+        self.conn.executemany(
+            "INSERT INTO jobs (id, created_at) VALUES (?, ?) ON CONFLICT(id) DO UPDATE SET "
+            "eval_status = 'pending', eval_lease_owner = NULL, eval_lease_expires_at = NULL, "
+            "eval_attempts = 0, eval_error = NULL",
+            [(str(prompt_id), now + i * 1e-6) for i, prompt_id in enumerate(prompt_ids)]
+        )
+
+    def claim(self, worker_id, lease_seconds):
+        now = time.time()
+        row = self.conn.execute("""
+            UPDATE jobs
+            SET eval_status = 'running', eval_lease_owner = ?, eval_lease_expires_at = ?,
+                eval_attempts = eval_attempts + 1
+            WHERE id = (
+                SELECT id FROM jobs
+                WHERE (eval_status = 'pending' AND eval_lease_expires_at IS NULL)
+                    OR (eval_status IN ('pending', 'running') AND eval_lease_expires_at < ?)
+                ORDER BY created_at
+                LIMIT 1
+            )
+            RETURNING id, eval_attempts
+        """, (worker_id, now + lease_seconds, now)).fetchone()
+        return {'id': row[0], 'attempts': row[1]} if row else None
+
+    def heartbeat(self, job_id, worker_id, lease_seconds):
+        cursor = self.conn.execute(
+            "UPDATE jobs SET eval_lease_expires_at = ? "
+            "WHERE id = ? AND eval_status = 'running' AND eval_lease_owner = ?",
+            (time.time() + lease_seconds, job_id, worker_id)
+        )
+        return cursor.rowcount > 0
+
+    def complete(self, job_id, worker_id):
+        cursor = self.conn.execute(
+            "UPDATE jobs SET eval_status = 'done', eval_lease_owner = NULL, eval_lease_expires_at = NULL, eval_error = NULL "
+            "WHERE id = ? AND eval_lease_owner = ?",
+            (job_id, worker_id)
+        )
+        return cursor.rowcount > 0
+
+    def fail(self, job_id, worker_id, error, retry, retry_delay=0):
+        cursor = self.conn.execute(
+            "UPDATE jobs SET eval_status = ?, eval_lease_owner = NULL, eval_lease_expires_at = ?, eval_error = ? "
+            "WHERE id = ? AND eval_lease_owner = ?",
+            ('pending' if retry else 'failed', time.time() + retry_delay if retry and retry_delay else None,
+             error, job_id, worker_id)
+        )
+        return cursor.rowcount > 0
+
+    def counts(self):
+        """Number of jobs in each status"""
+        return dict(self.conn.execute("SELECT eval_status, COUNT(*) FROM jobs GROUP BY eval_status").fetchall())
+
+
+class EvaluationWorker:
+    def __init__(self, queue, handler, worker_id=None, lease_seconds=120,
+                 heartbeat_interval=30, poll_interval=5, max_attempts=3, retry_backoff=30):
+        """Pull jobs from queue and run handler(prompt_id, lease_alive) on each while holding its lease
+
+        lease_alive() re-checks (and extends) the lease; handlers call it before
+        writing results so a worker that lost its job stops writing. A failed job
+        waits retry_backoff seconds before its second attempt, doubling after that,
+        so a judge outage does not use up every attempt at once.
+        """
+        if heartbeat_interval >= lease_seconds:
+            raise ValueError("heartbeat_interval must be shorter than lease_seconds")
+
+        self.queue = queue
+        self.handler = handler
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.lease_seconds = lease_seconds
+        self.heartbeat_interval = heartbeat_interval
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.stats = {'completed': 0, 'failed': 0, 'lost': 0}
+        self._queue_lock = threading.Lock()
+
+    def _heartbeat_loop(self, job_id, stop, lost):
+        while not stop.wait(self.heartbeat_interval):
+            with self._queue_lock:
+                alive = self.queue.heartbeat(job_id, self.worker_id, self.lease_seconds)
+            if not alive:
+                lost.set()
+                return
+
+    def _confirm_lease(self, job_id, lost):
+        """Check the lease is still ours right now, extending it if so"""
+        if lost.is_set():
+            return False
+        with self._queue_lock:
+            alive = self.queue.heartbeat(job_id, self.worker_id, self.lease_seconds)
+        if not alive:
+            lost.set()
+        return alive
+
+    def process_one(self):
+        """Claim and run a single job; returns False when nothing was claimable"""
+        with self._queue_lock:
+            job = self.queue.claim(self.worker_id, self.lease_seconds)
+        if not job:
+            return False
+
+        job_id = job['id']
+        if job['attempts'] > self.max_attempts:
+            # Reclaimed too many times (e.g. it keeps killing workers)
+            with self._queue_lock:
+                self.queue.fail(job_id, self.worker_id, "Exceeded max attempts", retry=False)
+            self.stats['failed'] += 1
+            print(f"❌ [{self.worker_id}] {job_id} exceeded {self.max_attempts} attempts")
+            return True
+
+        print(f"🔒 [{self.worker_id}] Claimed {job_id} (attempt {job['attempts']})")
+        stop, lost = threading.Event(), threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat_loop, args=(job_id, stop, lost), daemon=True)
+        heartbeat.start()
+
+        try:
+            self.handler(job_id, lambda: self._confirm_lease(job_id, lost))
+            error = None
+        except Exception as e:
+            error = str(e)
+        finally:
+            stop.set()
+            heartbeat.join()
+
+        with self._queue_lock:
+            if lost.is_set():
+                # Another worker now owns the job; it will write its own outcome
+                self.stats['lost'] += 1
+                print(f"⚠️ [{self.worker_id}] Lost lease on {job_id}")
+            elif error is None:
+                self.queue.complete(job_id, self.worker_id)
+                self.stats['completed'] += 1
+                print(f"✅ [{self.worker_id}] Completed {job_id}")
+            else:
+                retry = job['attempts'] < self.max_attempts
+                retry_delay = self.retry_backoff * 2 ** (job['attempts'] - 1)
+                self.queue.fail(job_id, self.worker_id, error, retry=retry, retry_delay=retry_delay)
+                if not retry:
+                    self.stats['failed'] += 1
+                print(f"❌ [{self.worker_id}] {job_id} failed: {error}" + (f" (retry in {retry_delay}s)" if retry else ""))
+
+        return True
+
+    def run(self, max_jobs=None, exit_when_empty=False):
+        """Process jobs until max_jobs is reached, or the queue is empty if exit_when_empty"""
+        processed = 0
+        while max_jobs is None or processed < max_jobs:
+            if self.process_one():
+                processed += 1
+            elif exit_when_empty:
+                break
+            else:
+                time.sleep(self.poll_interval)
+        return self.stats
+
+
+def _build_queue(local_db):
+    if local_db:
+        return SQLiteJobQueue(local_db)
+
+    from supabase import create_client
+    supabase_url = os.getenv("SUPABASE_URL")
+    supabase_key = os.getenv("SUPABASE_ANON_KEY")
+    if not supabase_url or not supabase_key:
+        raise ValueError("Missing SUPABASE_URL or SUPABASE_ANON_KEY environment variables")
+    return SupabaseJobQueue(create_client(supabase_url, supabase_key))
+
+
+def _run_worker_process(local_db, simulate_seconds, lease_seconds, heartbeat_interval, poll_interval, exit_when_empty,
+                        retry_backoff):
+    """Entry point for one worker process"""
+    queue = _build_queue(local_db)
+
+    if simulate_seconds is not None:
+        # Stand-in for the judge so scaling can be measured without API calls
+        handler = lambda prompt_id, lease_alive: time.sleep(simulate_seconds)
+    else:
+        from llm_evaluator import LLMEvaluator
+        evaluator = LLMEvaluator()
+
+        def handler(prompt_id, lease_alive):
+            # Records are discarded as they stream so a long-lived worker stays flat in memory
+            failed = 0
+            eval_ids = []
+            for record in evaluator.iter_evaluation(prompt_id=prompt_id, before_store=lease_alive):
+                if record['eval_id']:
+                    eval_ids.append(record['eval_id'])
+                if record['error'] or not record['eval_id']:
+                    failed += 1
+
+            # Judge errors come back as text, so raise here to go through the retry path;
+            # this attempt's rows go, earlier evaluations stay until a run succeeds
+            if failed:
+                evaluator.delete_evaluation_ids(eval_ids)
+                raise RuntimeError(f"{failed} judge call(s) failed or were not stored")
+
+            # Only a run that still holds its lease replaces the rows of earlier runs and attempts
+            if lease_alive():
+                evaluator.delete_evaluations(prompt_id, keep_ids=eval_ids)
+
+    worker = EvaluationWorker(
+        queue,
+        handler,
+        lease_seconds=lease_seconds,
+        heartbeat_interval=heartbeat_interval,
+        poll_interval=poll_interval,
+        retry_backoff=retry_backoff
+    )
+    return worker.run(exit_when_empty=exit_when_empty)
+
+
+def main():
+    """Command line interface for evaluation workers"""
+    import argparse
+    from multiprocessing import Process
+
+    parser = argparse.ArgumentParser(description="Run evaluation workers that claim jobs through leases")
+    parser.add_argument("--processes", type=int, default=1, help="Worker processes to start on this host (default: 1)")
+    parser.add_argument("--enqueue", nargs="+", metavar="PROMPT_ID", help="Mark prompts as pending evaluation and exit")
+    parser.add_argument("--local-db", type=str, help="Use a local SQLite file as the job queue instead of Supabase")
+    parser.add_argument("--simulate", type=float, metavar="SECONDS", help="Sleep instead of calling the judge (for load tests)")
+    parser.add_argument("--lease", type=int, default=120, help="Lease length in seconds (default: 120)")
+    parser.add_argument("--heartbeat", type=int, default=30, help="Heartbeat interval in seconds (default: 30)")
+    parser.add_argument("--poll", type=float, default=5, help="Seconds to wait when no job is available (default: 5)")
+    parser.add_argument("--retry-backoff", type=float, default=30, help="Seconds before a failed job's first retry, doubling each time (default: 30)")
+    parser.add_argument("--exit-when-empty", action="store_true", help="Stop once no job can be claimed (jobs still backing off stay pending)")
+
+    args = parser.parse_args()
+
+    try:
+        if args.enqueue:
+            _build_queue(args.local_db).enqueue(args.enqueue)
+            print(f"📥 Enqueued {len(args.enqueue)} prompts")
+            return
+
+        worker_args = (args.local_db, args.simulate, args.lease, args.heartbeat, args.poll, args.exit_when_empty,
+                       args.retry_backoff)
+        start_time = time.time()
+
+        if args.processes == 1:
+            _run_worker_process(*worker_args)
+        else:
+            processes = [Process(target=_run_worker_process, args=worker_args) for _ in range(args.processes)]
+            for process in processes:
+                process.start()
+            for process in processes:
+                process.join()
+
+        print(f"🏁 Workers finished in {time.time() - start_time:.1f}s")
+
+    except Exception as e:
+        print(f"❌ Error: {e}")
+
+
+if __name__ == "__main__":
+    main()
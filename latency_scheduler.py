@@ -0,0 +1,323 @@
+"""
+Latency Scheduler - Order batch work longest-expected-first from stored response times
+
+Judge latencies are read from an optional column on llm_evaluations:
+
+    ALTER TABLE llm_evaluations ADD COLUMN judge_latency_ms INTEGER;
+
+Without it, estimates fall back to model response times only.
+"""
+
+import heapq
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from statistics import median
+
+DEFAULT_LATENCY_MS = 30000
+HISTORY_LIMIT = 1000
+
+
+def judge_key(judge_model):
+    """Estimator key for a judge model, kept apart from the same model answering prompts"""
+    return f"judge:{judge_model}"
+
+
+class LatencyEstimator:
+    def __init__(self, history=None, default_ms=DEFAULT_LATENCY_MS):
+        """Median latency per key (model name or judge_key) from observed times in ms"""
+        self.history = {key: list(times) for key, times in (history or {}).items()}
+        self.default_ms = default_ms
+
+    @classmethod
+    def from_supabase(cls, supabase, limit=HISTORY_LIMIT):
+        """Build estimates from recent model_responses and llm_evaluations timings"""
+        history = {}
+
+        responses = supabase.table("model_responses")\
+            .select("model_name, response_time_ms")\
+            .is_("response_error", "null")\
+            .order("created_at", desc=True)\
+            .limit(limit)\
+            .execute()
+        for row in responses.data:
+            if row.get('response_time_ms'):
+                history.setdefault(row['model_name'], []).append(row['response_time_ms'])
+
+        try:
+            evaluations = supabase.table("llm_evaluations")\
+                .select("judge_model, judge_latency_ms")\
+                .not_.is_("judge_latency_ms", "null")\
+                .order("created_at", desc=True)\
+                .limit(limit)\
+                .execute()
+            for row in evaluations.data:
+                history.setdefault(judge_key(row['judge_model']), []).append(row['judge_latency_ms'])
+        except Exception as e:
+            # judge_latency_ms is optional; judges then get the median of known keys
+            print(f"⚠️ No judge latency history ({e}); using response times only")
+
+        return cls(history)
+
+    def observe(self, key, latency_ms):
+        """Add a fresh measurement so later batches in this process use it"""
+        self.history.setdefault(key, []).append(latency_ms)
+
+    def estimate(self, key):
+        """Expected latency in ms; unseen keys get the median of known keys"""
+        if self.history.get(key):
+            return median(self.history[key])
+        known = [median(times) for times in self.history.values() if times]
+        return median(known) if known else self.default_ms
+
+    def order_longest_first(self, keys):
+        """Keys sorted by expected latency, slowest first (stable for ties)"""
+        return sorted(keys, key=self.estimate, reverse=True)
+
+    def predict_makespan(self, keys, max_workers):
+        """Expected batch wall time when keys start in the given order on max_workers slots"""
+        slots = [0] * max(1, min(max_workers, len(keys)))
+        for key in keys:
+            # Each job starts on whichever slot frees up first
+            heapq.heapreplace(slots, slots[0] + self.estimate(key))
+        return max(slots) if keys else 0
+
+
+def simulate_makespan(estimator, jobs, max_workers, longest_first=True):
+    """Predicted wall time for jobs (and their follow-ups) on max_workers slots
+
+    A job with a 'follow_up_key' is assumed to enqueue one follow-up job with
+    that key when it finishes. Free slots take the longest expected pending
+    job, or the oldest one when longest_first is False.
+    """
+    slots = max(1, max_workers)
+    pending = []
+    running = []
+    seq = 0
+
+    def push(key, follow_up_key):
+        nonlocal seq
+        priority = -estimator.estimate(key) if longest_first else 0
+        heapq.heappush(pending, (priority, seq, key, follow_up_key))
+        seq += 1
+
+    for job in jobs:
+        push(job['key'], job.get('follow_up_key'))
+
+    now = 0
+    while pending or running:
+        while pending and len(running) < slots:
+            _, _, key, follow_up_key = heapq.heappop(pending)
+            heapq.heappush(running, (now + estimator.estimate(key), key, follow_up_key))
+        now, _, follow_up_key = heapq.heappop(running)
+        if follow_up_key:
+            push(follow_up_key, None)
+
+    return now
+
+
+def run_batch(jobs, worker_fn, estimator, max_workers, follow_up=None):
+    """Run jobs on one shared pool, always starting the longest expected pending job next
+
+    jobs are dicts with a 'key' used for latency estimates (and optionally a
+    'follow_up_key' for prediction); worker_fn(job) returns the job's result.
+    follow_up(job, result) may return a new job, which joins the same pending
+    queue, so follow-ups interleave with the remaining work instead of waiting
+    for the whole batch. A job whose worker_fn raises is counted as failed, gets
+    None as its result and no follow-up. Returns (results of the initial jobs
+    in order, report).
+    """
+    if max_workers < 1:
+        raise ValueError("max_workers must be at least 1")
+
+    report = {
+        'jobs': len(jobs),
+        'max_workers': max_workers,
+        'predicted_makespan_ms': int(simulate_makespan(estimator, jobs, max_workers)),
+        'list_order_makespan_ms': int(simulate_makespan(estimator, jobs, max_workers, longest_first=False)),
+        'failed': 0
+    }
+
+    results = [None] * len(jobs)
+    observed = []
+    pending = []
+    in_flight = {}
+    seq = 0
+
+    def push(job, index=None):
+        nonlocal seq
+        heapq.heappush(pending, (-estimator.estimate(job['key']), seq, index, job))
+        seq += 1
+
+    def timed(job):
+        start_time = time.time()
+        result = worker_fn(job)
+        return result, int((time.time() - start_time) * 1000)
+
+    for index, job in enumerate(jobs):
+        push(job, index)
+
+    batch_start = time.time()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or in_flight:
+            while pending and len(in_flight) < max_workers:
+                _, _, index, job = heapq.heappop(pending)
+                in_flight[executor.submit(timed, job)] = (index, job)
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, job = in_flight.pop(future)
+                if index is None:
+                    report['jobs'] += 1
+                try:
+                    result, latency_ms = future.result()
+                except Exception as e:
+                    # One failed job (e.g. a database insert) must not abandon the rest of the batch
+                    report['failed'] += 1
+                    print(f"❌ {job['key']} job failed: {e}")
+                    continue
+
+                observed.append((job['key'], latency_ms))
+                if index is not None:
+                    results[index] = result
+
+                next_job = follow_up(job, result) if follow_up else None
+                if next_job:
+                    push(next_job)
+
+    report['actual_makespan_ms'] = int((time.time() - batch_start) * 1000)
+
+    # Feed actuals back after predicting so the report compares against prior history
+    for key, latency_ms in observed:
+        estimator.observe(key, latency_ms)
+
+    return results, report
+
+
+def print_report(label, report):
+    print(f"\n⏱️ {label}: {report['jobs']} jobs on {report['max_workers']} workers")
+    print(f"   Predicted makespan: {report['predicted_makespan_ms'] / 1000:.1f}s "
+          f"(list order would be {report['list_order_makespan_ms'] / 1000:.1f}s)")
+    print(f"   Actual makespan: {report['actual_makespan_ms'] / 1000:.1f}s")
+    if report['failed']:
+        print(f"   Failed jobs: {report['failed']}")
+
+
+def load_prompts_file(path):
+    """Sample questions from a file, one per line prefixed with '>>>'"""
+    with open(path, 'r') as f:
+        return [line[3:].strip() for line in f if line.startswith('>>>') and line[3:].strip()]
+
+
+def main():
+    """Command line interface for latency-scheduled benchmark batches"""
+    import argparse
+    from dotenv import load_dotenv
+    from supabase import create_client
+    from model_use import model_list, get_responses_from_models
+
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Run a benchmark batch scheduled by historical latency")
+    parser.add_argument("--prompts-file", type=str, default="testing_qs.txt", help="File of '>>>' prompts (default: testing_qs.txt)")
+    parser.add_argument("--models", nargs="+", default=model_list, help="Models to query (default: all)")
+    parser.add_argument("--max-workers", type=int, default=8, help="Concurrent requests across the whole batch (default: 8)")
+    parser.add_argument("--evaluate", action="store_true", help="Also judge each response as soon as it arrives, on the same worker pool")
+    parser.add_argument("--dry-run", action="store_true", help="Only print the schedule and predicted makespan")
+
+    args = parser.parse_args()
+    if args.max_workers < 1:
+        parser.error("--max-workers must be at least 1")
+
+    try:
+        api_key = os.getenv("OPENROUTER_API_KEY")
+        supabase_url = os.getenv("SUPABASE_URL")
+        supabase_key = os.getenv("SUPABASE_ANON_KEY")
+        if not all([api_key, supabase_url, supabase_key]):
+            raise ValueError("Missing required environment variables")
+
+        supabase = create_client(supabase_url, supabase_key)
+        estimator = LatencyEstimator.from_supabase(supabase)
+        prompts = load_prompts_file(args.prompts_file)
+
+        jobs = [{'key': model, 'model': model, 'prompt': prompt} for prompt in prompts for model in args.models]
+        print(f"📦 {len(prompts)} prompts x {len(args.models)} models = {len(jobs)} jobs")
+        for model in estimator.order_longest_first(args.models):
+            print(f"   {model}: ~{estimator.estimate(model) / 1000:.1f}s expected")
+
+        if args.dry_run:
+            if args.evaluate:
+                from llm_evaluator import JUDGE_MODEL
+                for job in jobs:
+                    job['follow_up_key'] = judge_key(JUDGE_MODEL)
+            print(f"\n⏱️ Predicted makespan: {simulate_makespan(estimator, jobs, args.max_workers) / 1000:.1f}s")
+            return
+
+        prompt_ids = {}
+        for prompt in prompts:
+            prompt_result = supabase.table("prompts").insert({
+                "prompt_text": prompt,
+                "selected_models": args.models,
+                "total_models": len(args.models),
+                "status": "pending"
+            }).execute()
+            prompt_ids[prompt] = prompt_result.data[0]["id"]
+
+        evaluator = None
+        if args.evaluate:
+            from llm_evaluator import LLMEvaluator, JUDGE_MODEL
+            evaluator = LLMEvaluator()
+            for job in jobs:
+                job['follow_up_key'] = judge_key(JUDGE_MODEL)
+
+        def query(job):
+            timings = {}
+            response = get_responses_from_models([job['model']], job['prompt'], api_key, timings=timings)[job['model']]
+            failed = isinstance(response, str) and response.startswith("Error:")
+            supabase.table("model_responses").insert({
+                "prompt_id": prompt_ids[job['prompt']],
+                "model_name": job['model'],
+                "response_content": None if failed else response.content,
+                "response_error": response if failed else None,
+                "response_time_ms": timings[job['model']]
+            }).execute()
+            return None if failed else response.content
+
+        def judge(job):
+            start_time = time.time()
+            evaluation = evaluator.evaluate_single_response(job['prompt'], job['model'], job['content'])
+            latency_ms = int((time.time() - start_time) * 1000)
+
+            scores = evaluator.parse_evaluation_scores(evaluation)
+            if not evaluation.startswith("Error during evaluation"):
+                scores = evaluator.repair_missing_scores(evaluation, scores)
+            evaluator.store_evaluation_result(job['prompt_id'], job['model'], evaluation, scores, latency_ms=latency_ms)
+
+        def run_job(job):
+            return judge(job) if job.get('judge') else query(job)
+
+        def judge_follow_up(job, content):
+            # Each response is judged as soon as it lands, sharing the pool with remaining model calls
+            if not evaluator or job.get('judge') or content is None:
+                return None
+            return {
+                'key': judge_key(JUDGE_MODEL),
+                'judge': True,
+                'prompt': job['prompt'],
+                'model': job['model'],
+                'content': content,
+                'prompt_id': prompt_ids[job['prompt']]
+            }
+
+        _, report = run_batch(jobs, run_job, estimator, args.max_workers, follow_up=judge_follow_up)
+        print_report("Responses and evaluations" if evaluator else "Model responses", report)
+
+        for prompt_id in prompt_ids.values():
+            supabase.table("prompts").update({"status": "completed"}).eq("id", prompt_id).execute()
+
+    except Exception as e:
+        print(f"❌ Error: {e}")
+
+
+if __name__ == "__main__":
+    main()
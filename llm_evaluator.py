@@ -9,11 +9,43 @@ from langchain_openai import ChatOpenAI
 from supabase import create_client, Client
 import json
 import re
+import time
 
 load_dotenv()
 
+JUDGE_MODEL = "x-ai/grok-4-fast:free"
+
+PROMPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompts")
+
+# Judge input above this (estimated) size switches to the compact rubric, then
+# splits comparative sets and shortens long responses
+JUDGE_INPUT_BUDGET_TOKENS = 24000
+
+# Room left for the "[... N characters omitted ...]" marker in a shortened response
+OMISSION_MARKER_TOKENS = 16
+
+# Fields the judge reports in its summary block: five dimensions plus overall
+SCORE_FIELDS = [
+    'confusion_recognition',
+    'adaptive_response',
+    'learning_facilitation',
+    'strategic_decision',
+    'engagement_eq',
+    'overall'
+]
+
+# Labels the judge uses for each field, in the form parse_evaluation_scores expects
+SCORE_LABELS = {
+    'confusion_recognition': 'Confusion Recognition',
+    'adaptive_response': 'Adaptive Response',
+    'learning_facilitation': 'Learning Facilitation',
+    'strategic_decision': 'Strategic Decision-Making',
+    'engagement_eq': 'Engagement & Emotional Intelligence',
+    'overall': 'Overall Effectiveness Score'
+}
+
 class LLMEvaluator:
-    def __init__(self):
+    def __init__(self, input_budget_tokens=JUDGE_INPUT_BUDGET_TOKENS):
         self.api_key = os.getenv("OPENROUTER_API_KEY")
         self.supabase_url = os.getenv("SUPABASE_URL")
         self.supabase_key = os.getenv("SUPABASE_ANON_KEY")
@@ -25,7 +57,7 @@ class LLMEvaluator:
         
         # Initialize Grok-4-Fast as judge model
         self.judge_model = ChatOpenAI(
-            model="x-ai/grok-4-fast:free",
+            model=JUDGE_MODEL,
             openai_api_key=self.api_key,
             openai_api_base="https://openrouter.ai/api/v1",
             headers={
@@ -34,16 +66,40 @@ class LLMEvaluator:
             }
         )
         
-        # Load evaluation system prompt
+        # Load evaluation system prompt, plus a shorter variant for oversized inputs
         self.system_prompt = self._load_evaluation_prompt()
+        self.compact_prompt = self._load_evaluation_prompt('evaluation_prompt_compact.md')
+        self.input_budget_tokens = input_budget_tokens
+        
+        # Estimated vs actual judge input tokens, and how often the budget forced a fallback
+        self.token_stats = {
+            'calls': 0,
+            'estimated_input': 0,
+            'actual_input': 0,
+            'no_usage': 0,
+            'no_usage_estimated': 0,
+            'compact_rubric': 0,
+            'split_comparisons': 0,
+            'shortened_responses': 0
+        }
+        
+        # Latency and output size per evaluation mode, for comparing scores-only runs
+        self.mode_stats = {
+            'full': {'count': 0, 'latency_ms': 0, 'output_tokens': 0},
+            'scores_only': {'count': 0, 'latency_ms': 0, 'output_tokens': 0, 'cancelled': 0}
+        }
+        self.full_token_baseline = None
+        
+        # Follow-up asks for scores the parser could not find
+        self.repair_stats = {'needed': 0, 'repaired': 0, 'tokens': 0}
     
-    def _load_evaluation_prompt(self):
-        """Load the evaluation system prompt from file"""
+    def _load_evaluation_prompt(self, filename='evaluation_prompt.md'):
+        """Load an evaluation system prompt from the prompts directory"""
         try:
-            with open('/Users/satvikp/Desktop/mygit/educhain-tutorbench/prompts/evaluation_prompt.md', 'r') as f:
+            with open(os.path.join(PROMPTS_DIR, filename), 'r') as f:
                 return f.read()
         except FileNotFoundError:
-            raise FileNotFoundError("evaluation_prompt.md not found. Please ensure the file exists.")
+            raise FileNotFoundError(f"{filename} not found. Please ensure the file exists.")
     
     def get_prompt_responses(self, prompt_id=None, prompt_text=None):
         """Retrieve prompt and responses from database"""
@@ -80,10 +136,14 @@ class LLMEvaluator:
         
         return prompt_data, responses_result.data
     
-    def evaluate_single_response(self, prompt_text, model_name, response_content):
-        """Evaluate a single model response"""
-        evaluation_prompt = f"""
-{self.system_prompt}
+    def _estimate_tokens(self, text):
+        """Rough token count for text (about 4 characters per token)"""
+        return max(1, len(text) // 4) if text else 0
+    
+    def _build_single_prompt(self, prompt_text, model_name, response_content, rubric=None):
+        """Assemble the judge prompt for a single response"""
+        return f"""
+{rubric or self.system_prompt}
 
 ## Evaluation Task
 
@@ -95,21 +155,167 @@ class LLMEvaluator:
 
 Please evaluate this response using the framework provided. Provide scores for all 5 dimensions and follow the exact output format specified in the system prompt.
 """
+    
+    def _shorten_response(self, response_content, max_tokens):
+        """Keep the start and end of an overlong response, marking the omitted middle"""
+        if self._estimate_tokens(response_content) <= max_tokens:
+            return response_content
+        
+        self.token_stats['shortened_responses'] += 1
+        # Leave room for the omission marker itself
+        keep_chars = max(max_tokens - OMISSION_MARKER_TOKENS, 0) * 4
+        head = response_content[:keep_chars * 2 // 3]
+        tail = response_content[-(keep_chars // 3):] if keep_chars >= 3 else ""
+        omitted = len(response_content) - len(head) - len(tail)
+        return f"{head}\n\n[... {omitted} characters omitted for length ...]\n\n{tail}"
+    
+    def _fit_single_prompt(self, prompt_text, model_name, response_content):
+        """Single-response judge prompt that fits the input budget
+        
+        Uses the full rubric if it fits, otherwise the compact rubric, and as a
+        last resort shortens the response itself. Raises ValueError when the
+        prompt and rubric alone leave no room for the response.
+        """
+        evaluation_prompt = self._build_single_prompt(prompt_text, model_name, response_content)
+        if self._estimate_tokens(evaluation_prompt) <= self.input_budget_tokens:
+            return evaluation_prompt
         
+        self.token_stats['compact_rubric'] += 1
+        evaluation_prompt = self._build_single_prompt(prompt_text, model_name, response_content, self.compact_prompt)
+        if self._estimate_tokens(evaluation_prompt) <= self.input_budget_tokens:
+            return evaluation_prompt
+        
+        overhead = self._estimate_tokens(self._build_single_prompt(prompt_text, model_name, "", self.compact_prompt))
+        if self.input_budget_tokens - overhead <= OMISSION_MARKER_TOKENS:
+            print(f"    ⚠️ Judge {model_name}: prompt and compact rubric alone need ~{overhead} tokens "
+                  f"(budget {self.input_budget_tokens}), skipping")
+            raise ValueError(f"judge input over budget (~{overhead} tokens before the response, "
+                             f"budget {self.input_budget_tokens})")
+        shortened = self._shorten_response(response_content, self.input_budget_tokens - overhead)
+        return self._build_single_prompt(prompt_text, model_name, shortened, self.compact_prompt)
+    
+    def _invoke_judge(self, evaluation_prompt, label):
+        """Invoke the judge, logging estimated and actual input tokens"""
+        estimated = self._estimate_tokens(evaluation_prompt)
+        response = self.judge_model.invoke(evaluation_prompt)
+        
+        usage = getattr(response, 'usage_metadata', None) or {}
+        actual = usage.get('input_tokens')
+        self.token_stats['calls'] += 1
+        self.token_stats['estimated_input'] += estimated
+        if actual:
+            self.token_stats['actual_input'] += actual
+        else:
+            self.token_stats['no_usage'] += 1
+            self.token_stats['no_usage_estimated'] += estimated
+        print(f"    🧮 {label}: ~{estimated} input tokens estimated, {actual if actual else 'unknown'} actual")
+        return response
+    
+    def _record_mode_stats(self, mode, latency_ms, output_tokens, cancelled=False):
+        """Accumulate latency and output tokens for an evaluation mode"""
+        stats = self.mode_stats[mode]
+        stats['count'] += 1
+        stats['latency_ms'] += latency_ms
+        stats['output_tokens'] += output_tokens
+        if cancelled:
+            stats['cancelled'] += 1
+    
+    def evaluate_single_response(self, prompt_text, model_name, response_content):
+        """Evaluate a single model response"""
         try:
-            response = self.judge_model.invoke(evaluation_prompt)
+            evaluation_prompt = self._fit_single_prompt(prompt_text, model_name, response_content)
+            start_time = time.time()
+            response = self._invoke_judge(evaluation_prompt, f"Judge {model_name}")
+            latency_ms = int((time.time() - start_time) * 1000)
+            
+            # Estimated from visible text, the same way scores-only streams and the
+            # stored baseline are measured (usage counts would include reasoning tokens)
+            self._record_mode_stats('full', latency_ms, self._estimate_tokens(response.content))
             return response.content
         except Exception as e:
             return f"Error during evaluation: {str(e)}"
     
-    def evaluate_multiple_responses(self, prompt_text, responses):
-        """Evaluate multiple responses comparatively"""
+    def evaluate_scores_only(self, prompt_text, model_name, response_content):
+        """Stream a single-response evaluation and stop as soon as all scores are parsed
+        
+        Returns the (truncated) evaluation text and the scores found in it.
+        """
+        try:
+            evaluation_prompt = self._fit_single_prompt(prompt_text, model_name, response_content)
+        except ValueError as e:
+            return f"Error during evaluation: {str(e)}", {}
+        # Streams are cancelled before usage arrives, so only the estimate is logged
+        print(f"    🧮 Judge {model_name}: ~{self._estimate_tokens(evaluation_prompt)} input tokens estimated")
+        
+        evaluation = ""
+        scores = {}
+        cancelled = False
+        start_time = time.time()
+        
+        try:
+            stream = self.judge_model.stream(evaluation_prompt)
+            try:
+                for chunk in stream:
+                    if not chunk.content:
+                        continue
+                    evaluation += chunk.content
+                    
+                    # Scores only match once their "/10" has arrived, so re-parsing
+                    # the growing buffer never yields a half-streamed number
+                    scores = self.parse_evaluation_scores(evaluation)
+                    if all(field in scores for field in SCORE_FIELDS):
+                        cancelled = True
+                        break
+            finally:
+                # Closing the generator drops the HTTP stream, so the judge stops generating
+                stream.close()
+        except Exception as e:
+            return f"Error during evaluation: {str(e)}", {}
+        
+        latency_ms = int((time.time() - start_time) * 1000)
+        self._record_mode_stats('scores_only', latency_ms, self._estimate_tokens(evaluation), cancelled)
+        return evaluation, scores
+    
+    def get_scores_only_savings(self):
+        """Compare average latency and output tokens of scores-only vs full evaluations"""
+        full = self.mode_stats['full']
+        fast = self.mode_stats['scores_only']
+        
+        if not fast['count']:
+            return None
+        
+        fast_latency = fast['latency_ms'] / fast['count']
+        fast_tokens = fast['output_tokens'] / fast['count']
+        
+        if full['count']:
+            full_latency = full['latency_ms'] / full['count']
+            full_tokens = full['output_tokens'] / full['count']
+        elif self.full_token_baseline:
+            # No full evaluations this session: compare tokens against stored ones only
+            full_latency = None
+            full_tokens = self.full_token_baseline
+        else:
+            return None
+        
+        return {
+            'full_avg_latency_ms': round(full_latency) if full_latency else None,
+            'scores_only_avg_latency_ms': round(fast_latency),
+            'latency_saved_pct': round(100 * (1 - fast_latency / full_latency), 1) if full_latency else None,
+            'full_avg_output_tokens': round(full_tokens),
+            'scores_only_avg_output_tokens': round(fast_tokens),
+            'tokens_saved_pct': round(100 * (1 - fast_tokens / full_tokens), 1) if full_tokens else 0.0,
+            'cancelled_early': fast['cancelled'],
+            'scores_only_count': fast['count']
+        }
+    
+    def _build_comparative_prompt(self, prompt_text, responses, rubric=None):
+        """Assemble the judge prompt comparing several responses"""
         response_text = ""
         for i, resp in enumerate(responses, 1):
             response_text += f"\n**Response {chr(64+i)} ({resp['model_name']}):**\n{resp['response_content']}\n"
         
-        evaluation_prompt = f"""
-{self.system_prompt}
+        return f"""
+{rubric or self.system_prompt}
 
 ## Comparative Evaluation Task
 
@@ -121,13 +327,123 @@ Please evaluate this response using the framework provided. Provide scores for a
 
 Please evaluate these responses using the comparative evaluation framework. Provide head-to-head scores and determine the winner.
 """
+    
+    def _split_comparative_groups(self, prompt_text, responses):
+        """Pack responses into groups of two or more whose compact-rubric prompts fit the budget
+        
+        Long responses are first capped so any two fit together; a trailing
+        response left on its own joins the previous group, whose responses are
+        then shortened further if needed.
+        """
+        overhead = self._estimate_tokens(self._build_comparative_prompt(prompt_text, [], self.compact_prompt))
+        # Header and spacing each response adds around its content
+        per_response_overhead = max(
+            self._estimate_tokens(self._build_comparative_prompt(
+                prompt_text, [dict(resp, response_content="")], self.compact_prompt)) - overhead
+            for resp in responses
+        )
+        available = self.input_budget_tokens - overhead
+        
+        def cap(group_size):
+            return available // group_size - per_response_overhead
+        
+        if cap(2) <= OMISSION_MARKER_TOKENS:
+            raise ValueError(f"judge input over budget (~{overhead} tokens before any response, "
+                             f"budget {self.input_budget_tokens})")
+        
+        def size(resp, max_tokens):
+            return min(self._estimate_tokens(resp['response_content']), max_tokens) + per_response_overhead
+        
+        groups = [[]]
+        used = 0
+        for resp in responses:
+            needed = size(resp, cap(2))
+            if groups[-1] and used + needed > available:
+                groups.append([])
+                used = 0
+            groups[-1].append(resp)
+            used += needed
+        
+        if len(groups) > 1 and len(groups[-1]) == 1:
+            groups[-2].extend(groups.pop())
+        
+        shortened_groups = []
+        for group in groups:
+            # Only a merged group can overflow the pairwise cap; it then shares the budget evenly
+            max_tokens = cap(2)
+            if sum(size(resp, max_tokens) for resp in group) > available:
+                max_tokens = cap(len(group))
+            shortened_groups.append([
+                dict(resp, response_content=self._shorten_response(resp['response_content'], max_tokens))
+                for resp in group
+            ])
+        return shortened_groups
+    
+    def evaluate_multiple_responses(self, prompt_text, responses):
+        """Evaluate multiple responses comparatively
+        
+        Falls back to the compact rubric when the full prompt is over budget, and
+        to several smaller comparisons when even that does not fit.
+        """
+        evaluation_prompt = self._build_comparative_prompt(prompt_text, responses)
+        split = False
+        
+        if self._estimate_tokens(evaluation_prompt) > self.input_budget_tokens:
+            self.token_stats['compact_rubric'] += 1
+            evaluation_prompt = self._build_comparative_prompt(prompt_text, responses, self.compact_prompt)
+            if self._estimate_tokens(evaluation_prompt) > self.input_budget_tokens:
+                self.token_stats['split_comparisons'] += 1
+                split = True
         
         try:
-            response = self.judge_model.invoke(evaluation_prompt)
-            return response.content
+            if not split:
+                return self._invoke_judge(evaluation_prompt, "Comparative").content
+            
+            groups = self._split_comparative_groups(prompt_text, responses)
+            print(f"    ✂️ Comparative set over budget, split into {len(groups)} groups")
+            sections = []
+            for i, group in enumerate(groups, 1):
+                group_prompt = self._build_comparative_prompt(prompt_text, group, self.compact_prompt)
+                response = self._invoke_judge(group_prompt, f"Comparative group {i}")
+                models = ", ".join(resp['model_name'] for resp in group)
+                sections.append(f"# Group {i} ({models})\n\n{response.content}")
+            return "\n\n".join(sections)
         except Exception as e:
             return f"Error during comparative evaluation: {str(e)}"
     
+    def evaluate_session(self, scenario_description, model_name, transcript):
+        """Evaluate a whole multi-turn tutoring conversation"""
+        conversation = ""
+        for turn in transcript:
+            speaker = "Student" if turn['role'] == 'student' else f"Tutor ({model_name})"
+            conversation += f"\n**{speaker}:**\n{turn['content']}\n"
+        
+        def build(rubric):
+            return f"""
+{rubric}
+
+## Multi-Turn Session Evaluation Task
+
+**Teaching Scenario:**
+{scenario_description}
+
+**Conversation Transcript:**
+{conversation}
+
+Please evaluate the tutor across the whole conversation using the framework provided, paying attention to how it adapted as the student's state changed. Provide scores for all 5 dimensions and follow the exact single response output format specified in the system prompt.
+"""
+        
+        evaluation_prompt = build(self.system_prompt)
+        if self._estimate_tokens(evaluation_prompt) > self.input_budget_tokens:
+            self.token_stats['compact_rubric'] += 1
+            evaluation_prompt = build(self.compact_prompt)
+        
+        try:
+            response = self._invoke_judge(evaluation_prompt, f"Session {model_name}")
+            return response.content
+        except Exception as e:
+            return f"Error during session evaluation: {str(e)}"
+    
     def parse_evaluation_scores(self, evaluation_text):
         """Parse numerical scores from evaluation text"""
         scores = {}
@@ -183,15 +499,95 @@ Please evaluate these responses using the comparative evaluation framework. Prov
         
         return scores
     
-    def store_evaluation_result(self, prompt_id, model_name, evaluation_text, scores):
+    def load_full_evaluation_baseline(self, limit=200):
+        """Average output tokens of stored full evaluations, used when no full run happened this session"""
+        result = self.supabase.table("llm_evaluations")\
+            .select("evaluation_text")\
+            .order("created_at", desc=True)\
+            .limit(limit)\
+            .execute()
+        
+        # Only full evaluations reach the narrative sections
+        texts = [row['evaluation_text'] for row in result.data
+                 if row.get('evaluation_text') and 'Would a Real Student Learn' in row['evaluation_text']]
+        if not texts:
+            return None
+        
+        self.full_token_baseline = sum(self._estimate_tokens(t) for t in texts) / len(texts)
+        return self.full_token_baseline
+    
+    def repair_missing_scores(self, evaluation_text, scores):
+        """Ask the judge only for the scores missing from an evaluation and merge them in
+        
+        The judge sees its own evaluation as context and answers in a strict
+        one-line-per-field format, which costs far less than a full re-judge.
+        """
+        missing = [field for field in SCORE_FIELDS if field not in scores]
+        if not missing:
+            return scores
+        
+        self.repair_stats['needed'] += 1
+        
+        answer_lines = "\n".join(
+            f"{SCORE_LABELS[field]}: X.X/10" if field == 'overall' else f"{SCORE_LABELS[field]}: X/10"
+            for field in missing
+        )
+        repair_prompt = f"""Below is an evaluation you wrote of an AI tutor's response. Some scores could not be read from it.
+
+**Your Evaluation:**
+{evaluation_text}
+
+Reply with ONLY the following lines, replacing X with the score you intended (1-10). No other text.
+
+{answer_lines}
+"""
+        
+        try:
+            response = self._invoke_judge(repair_prompt, "Score repair")
+        except Exception as e:
+            print(f"    ⚠️ Score repair failed: {e}")
+            return scores
+        
+        usage = getattr(response, 'usage_metadata', None) or {}
+        self.repair_stats['tokens'] += usage.get('total_tokens') or (
+            self._estimate_tokens(repair_prompt) + self._estimate_tokens(response.content)
+        )
+        
+        repaired = self.parse_evaluation_scores(response.content)
+        merged = dict(scores)
+        for field in missing:
+            if field in repaired:
+                merged[field] = repaired[field]
+        
+        if all(field in merged for field in SCORE_FIELDS):
+            self.repair_stats['repaired'] += 1
+        
+        return merged
+    
+    def delete_evaluations(self, prompt_id, keep_ids=None):
+        """Remove stored evaluations for a prompt, except the rows in keep_ids"""
+        query = self.supabase.table("llm_evaluations").delete().eq("prompt_id", prompt_id)
+        if keep_ids:
+            query = query.not_.in_("id", list(keep_ids))
+        query.execute()
+    
+    def delete_evaluation_ids(self, eval_ids):
+        """Remove specific stored evaluations by ID"""
+        if eval_ids:
+            self.supabase.table("llm_evaluations").delete().in_("id", list(eval_ids)).execute()
+    
+    def store_evaluation_result(self, prompt_id, model_name, evaluation_text, scores, latency_ms=None):
         """Store evaluation results in database"""
         evaluation_data = {
             "prompt_id": prompt_id,
             "model_name": model_name,
             "evaluation_text": evaluation_text,
             "scores": json.dumps(scores) if scores else None,
-            "judge_model": "x-ai/grok-4-fast:free"
+            "judge_model": JUDGE_MODEL
         }
+        # Optional column (see latency_scheduler); left out when unknown so older schemas keep working
+        if latency_ms is not None:
+            evaluation_data["judge_latency_ms"] = latency_ms
         
         try:
             result = self.supabase.table("llm_evaluations").insert(evaluation_data).execute()
@@ -200,8 +596,22 @@ Please evaluate these responses using the comparative evaluation framework. Prov
             print(f"Error storing evaluation: {e}")
             return None
     
-    def run_evaluation(self, prompt_id=None, prompt_text=None, comparative=True):
-        """Main evaluation function"""
+    def iter_evaluation(self, prompt_id=None, prompt_text=None, comparative=True, scores_only=False,
+                        repair=True, include_text=False, before_store=None):
+        """Evaluate a prompt's responses, yielding one compact record per evaluation
+        
+        Evaluation text is stored in the database and referenced by eval_id; it is
+        only included in the record when include_text=True, so a consumer that
+        drops each record keeps memory flat however many responses are judged.
+        
+        With scores_only=True the comparative pass is skipped and each judge stream
+        is cancelled once all scores have been read. With repair=True, scores the
+        parser misses are requested in a short follow-up instead of a full re-judge.
+        
+        before_store, if given, is called before each database write; returning
+        False stops the evaluation (e.g. a worker that lost its job lease).
+        Records carry error=True when the judge call failed.
+        """
         print("🔍 Starting LLM Evaluation...")
         
         # Get prompt and responses
@@ -219,13 +629,30 @@ Please evaluate these responses using the comparative evaluation framework. Prov
             print("❌ No valid responses found to evaluate")
             return
         
-        results = {}
-        
-        if comparative and len(valid_responses) > 1:
+        if comparative and not scores_only and len(valid_responses) > 1:
             print("🔄 Running comparative evaluation...")
             comparative_eval = self.evaluate_multiple_responses(prompt_text, valid_responses)
-            results['comparative'] = comparative_eval
+            
+            if before_store and not before_store():
+                print("⚠️ Stopping evaluation: results may no longer be stored")
+                return
+            # No latency: comparative calls take several times longer and would skew per-judge estimates
+            eval_id = self.store_evaluation_result(prompt_id, "comparative", comparative_eval, None)
             print("✅ Comparative evaluation completed")
+            
+            record = {
+                'type': 'comparative',
+                'prompt_id': prompt_id,
+                'response_id': None,
+                'model_name': 'comparative',
+                'eval_id': eval_id,
+                'scores': {},
+                'evaluation_chars': len(comparative_eval),
+                'error': comparative_eval.startswith("Error during")
+            }
+            if include_text:
+                record['evaluation'] = comparative_eval
+            yield record
         
         # Individual evaluations
         print("🔍 Running individual evaluations...")
@@ -234,17 +661,28 @@ Please evaluate these responses using the comparative evaluation framework. Prov
             response_content = response['response_content']
             
             print(f"  📊 Evaluating {model_name}...")
-            evaluation = self.evaluate_single_response(prompt_text, model_name, response_content)
-            scores = self.parse_evaluation_scores(evaluation)
+            start_time = time.time()
+            if scores_only:
+                evaluation, scores = self.evaluate_scores_only(prompt_text, model_name, response_content)
+            else:
+                evaluation = self.evaluate_single_response(prompt_text, model_name, response_content)
+                scores = self.parse_evaluation_scores(evaluation)
+            latency_ms = int((time.time() - start_time) * 1000)
             
-            # Store in database
-            eval_id = self.store_evaluation_result(prompt_id, model_name, evaluation, scores)
+            if repair and not evaluation.startswith("Error during evaluation"):
+                missing_before = len(SCORE_FIELDS) - len(scores)
+                scores = self.repair_missing_scores(evaluation, scores)
+                if missing_before:
+                    print(f"    🔧 Repair re-ask recovered {missing_before - (len(SCORE_FIELDS) - len(scores))}/{missing_before} missing scores")
             
-            results[model_name] = {
-                'evaluation': evaluation,
-                'scores': scores,
-                'eval_id': eval_id
-            }
+            # Store in database
+            # Scores-only latency is time to scores, so only full evaluations feed the latency history
+            if before_store and not before_store():
+                print("⚠️ Stopping evaluation: results may no longer be stored")
+                return
+            eval_id = self.store_evaluation_result(
+                prompt_id, model_name, evaluation, scores, None if scores_only else latency_ms
+            )
             
             # Debug info for score parsing
             if not scores:
@@ -252,9 +690,101 @@ Please evaluate these responses using the comparative evaluation framework. Prov
                 print(f"    📄 First 200 chars of evaluation: {evaluation[:200]}...")
             
             print(f"    ✅ {model_name} evaluated (ID: {eval_id})")
+            
+            record = {
+                'type': 'individual',
+                'prompt_id': prompt_id,
+                'response_id': response['id'],
+                'model_name': model_name,
+                'eval_id': eval_id,
+                'scores': scores,
+                'evaluation_chars': len(evaluation),
+                'error': evaluation.startswith("Error during")
+            }
+            if include_text:
+                record['evaluation'] = evaluation
+            yield record
         
         print("🎉 Evaluation completed!")
-        return results
+    
+    def run_evaluation(self, prompt_id=None, prompt_text=None, comparative=True, scores_only=False, repair=True):
+        """Main evaluation function
+        
+        Collects iter_evaluation into a dict keyed by model name, with full
+        evaluation texts. Prefer iter_evaluation for large batches.
+        """
+        results = {}
+        for record in self.iter_evaluation(prompt_id, prompt_text, comparative, scores_only, repair, include_text=True):
+            if record['type'] == 'comparative':
+                results['comparative'] = record['evaluation']
+            else:
+                results[record['model_name']] = {
+                    'evaluation': record['evaluation'],
+                    'scores': record['scores'],
+                    'eval_id': record['eval_id']
+                }
+        
+        return results or None
+
+
+class EvaluationSummary:
+    def __init__(self):
+        """Running per-model score aggregates built from evaluation records"""
+        self.models = {}
+        self.evaluations = 0
+        self.comparative = 0
+        self.unparsed = 0
+    
+    def add(self, record):
+        """Fold one evaluation record into the aggregates"""
+        if record['type'] == 'comparative':
+            self.comparative += 1
+            return
+        
+        self.evaluations += 1
+        if not record['scores']:
+            self.unparsed += 1
+        
+        model = self.models.setdefault(record['model_name'], {
+            'count': 0,
+            'sums': {field: 0 for field in SCORE_FIELDS},
+            'counts': {field: 0 for field in SCORE_FIELDS}
+        })
+        model['count'] += 1
+        for field, value in record['scores'].items():
+            if field in model['sums']:
+                model['sums'][field] += value
+                model['counts'][field] += 1
+    
+    def average(self, model_name, field):
+        model = self.models[model_name]
+        if not model['counts'][field]:
+            return 'N/A'
+        return round(model['sums'][field] / model['counts'][field], 2)
+    
+    def print_summary(self):
+        print("\n" + "="*50)
+        print("📋 EVALUATION SUMMARY")
+        print("="*50)
+        
+        for model_name, model in self.models.items():
+            print(f"\n🤖 {model_name} ({model['count']} evaluation(s))")
+            if any(model['counts'].values()):
+                print(f"   Overall Score: {self.average(model_name, 'overall')}/10")
+                print(f"   Confusion Recognition: {self.average(model_name, 'confusion_recognition')}/10")
+                print(f"   Adaptive Response: {self.average(model_name, 'adaptive_response')}/10")
+                print(f"   Learning Facilitation: {self.average(model_name, 'learning_facilitation')}/10")
+                print(f"   Strategic Decision: {self.average(model_name, 'strategic_decision')}/10")
+                print(f"   Engagement & EQ: {self.average(model_name, 'engagement_eq')}/10")
+            else:
+                print("   ⚠️ Could not parse scores")
+        
+        if self.unparsed:
+            print(f"\n⚠️ {self.unparsed}/{self.evaluations} evaluations had no parsable scores")
+        
+        if self.comparative:
+            print(f"\n🏆 {self.comparative} Comparative Analysis Available")
+            print("   Check the database for full comparative evaluation")
 
 
 def main():
@@ -262,10 +792,13 @@ def main():
     import argparse
     
     parser = argparse.ArgumentParser(description="Evaluate model responses using LLM judge")
-    parser.add_argument("--prompt-id", type=str, help="UUID of the prompt to evaluate")
+    parser.add_argument("--prompt-id", type=str, nargs="+", help="UUID(s) of the prompt(s) to evaluate")
     parser.add_argument("--prompt-text", type=str, help="Text of the prompt to evaluate (uses most recent)")
     parser.add_argument("--no-comparative", action="store_true", help="Skip comparative evaluation")
     parser.add_argument("--debug", action="store_true", help="Show full evaluation text for debugging")
+    parser.add_argument("--scores-only", action="store_true", help="Stream judge output and stop once all scores are found")
+    parser.add_argument("--no-repair", action="store_true", help="Do not re-ask the judge for scores that failed to parse")
+    parser.add_argument("--input-budget", type=int, default=JUDGE_INPUT_BUDGET_TOKENS, help=f"Judge input token budget (default: {JUDGE_INPUT_BUDGET_TOKENS})")
     
     args = parser.parse_args()
     
@@ -274,40 +807,63 @@ def main():
         return
     
     try:
-        evaluator = LLMEvaluator()
-        results = evaluator.run_evaluation(
-            prompt_id=args.prompt_id,
-            prompt_text=args.prompt_text,
-            comparative=not args.no_comparative
-        )
+        evaluator = LLMEvaluator(input_budget_tokens=args.input_budget)
+        summary = EvaluationSummary()
         
-        print("\n" + "="*50)
-        print("📋 EVALUATION SUMMARY")
-        print("="*50)
+        targets = [{'prompt_id': pid} for pid in args.prompt_id] if args.prompt_id else [{'prompt_text': args.prompt_text}]
         
-        for model_name, result in results.items():
-            if model_name == 'comparative':
-                continue
-            print(f"\n🤖 {model_name}")
-            if result['scores']:
-                print(f"   Overall Score: {result['scores'].get('overall', 'N/A')}/10")
-                print(f"   Confusion Recognition: {result['scores'].get('confusion_recognition', 'N/A')}/10")
-                print(f"   Adaptive Response: {result['scores'].get('adaptive_response', 'N/A')}/10")
-                print(f"   Learning Facilitation: {result['scores'].get('learning_facilitation', 'N/A')}/10")
-                print(f"   Strategic Decision: {result['scores'].get('strategic_decision', 'N/A')}/10")
-                print(f"   Engagement & EQ: {result['scores'].get('engagement_eq', 'N/A')}/10")
-            else:
-                print("   ⚠️ Could not parse scores")
-                
-            if args.debug:
-                print(f"\n📄 Full Evaluation Text for {model_name}:")
-                print("-" * 60)
-                print(result['evaluation'])
-                print("-" * 60)
-        
-        if 'comparative' in results:
-            print(f"\n🏆 Comparative Analysis Available")
-            print("   Check the database for full comparative evaluation")
+        for target in targets:
+            records = evaluator.iter_evaluation(
+                **target,
+                comparative=not args.no_comparative,
+                scores_only=args.scores_only,
+                repair=not args.no_repair,
+                include_text=args.debug
+            )
+            
+            try:
+                # Records are printed and folded into the summary as they arrive, then dropped
+                for record in records:
+                    summary.add(record)
+                    
+                    if args.debug:
+                        print(f"\n📄 Full Evaluation Text for {record['model_name']}:")
+                        print("-" * 60)
+                        print(record['evaluation'])
+                        print("-" * 60)
+            except ValueError as e:
+                # One missing prompt should not abort a batch
+                print(f"❌ Error: {e}")
+        
+        summary.print_summary()
+        
+        token_stats = evaluator.token_stats
+        with_usage = token_stats['calls'] - token_stats['no_usage']
+        if with_usage:
+            print(f"\n🧮 Judge input: ~{token_stats['estimated_input'] - token_stats['no_usage_estimated']} tokens estimated, "
+                  f"{token_stats['actual_input']} actual over {with_usage} calls")
+        if token_stats['no_usage']:
+            print(f"   {token_stats['no_usage']} calls reported no usage (~{token_stats['no_usage_estimated']} tokens estimated)")
+        if token_stats['compact_rubric'] or token_stats['shortened_responses']:
+            print(f"   Over budget: {token_stats['compact_rubric']} used the compact rubric, "
+                  f"{token_stats['split_comparisons']} comparisons split, "
+                  f"{token_stats['shortened_responses']} responses shortened")
+        
+        repair_stats = evaluator.repair_stats
+        if repair_stats['needed']:
+            print(f"\n🔧 {repair_stats['needed']} evaluation(s) needed score repair, "
+                  f"{repair_stats['repaired']} fully repaired (~{repair_stats['tokens']} tokens)")
+        
+        if args.scores_only:
+            evaluator.load_full_evaluation_baseline()
+            savings = evaluator.get_scores_only_savings()
+            if savings:
+                print(f"\n⚡ Scores-only savings ({savings['cancelled_early']}/{savings['scores_only_count']} streams cancelled early)")
+                print(f"   Output tokens (estimated from text): {savings['scores_only_avg_output_tokens']} vs {savings['full_avg_output_tokens']} full ({savings['tokens_saved_pct']}% saved)")
+                if savings['latency_saved_pct'] is not None:
+                    print(f"   Latency: {savings['scores_only_avg_latency_ms']} ms vs {savings['full_avg_latency_ms']} ms full ({savings['latency_saved_pct']}% saved)")
+                else:
+                    print(f"   Latency: {savings['scores_only_avg_latency_ms']} ms (no full evaluations this run to compare)")
         
     except Exception as e:
         print(f"❌ Error: {e}")
@@ -2,6 +2,8 @@ import streamlit as st
 # from dotenv import load_dotenv
 from model_use import get_responses_from_models, proprietary_models, open_source_models
 from supabase import create_client, Client
+from prompt_clusters import load_prompt_clusters
+from latency_scheduler import LatencyEstimator
 import time
 
 # load_dotenv()
@@ -27,7 +29,56 @@ if not supabase_url or not supabase_key:
     st.error("❌ SUPABASE_URL and SUPABASE_ANON_KEY must be set in environment variables.")
     st.stop()
 
-supabase: Client = create_client(supabase_url, supabase_key)
+@st.cache_resource
+def get_supabase_client(url, key) -> Client:
+    """Create the Supabase client once per server process"""
+    return create_client(url, key)
+
+supabase: Client = get_supabase_client(supabase_url, supabase_key)
+
+@st.cache_resource(ttl=600, show_spinner="Indexing existing prompts...")
+def get_prompt_cluster_index(url, key):
+    """MinHash/LSH index of all stored prompts, shared by every session and rebuilt every
+    10 minutes to pick up prompts added by other processes"""
+    return load_prompt_clusters(get_supabase_client(url, key))
+
+@st.cache_resource(ttl=600, show_spinner=False)
+def get_latency_estimator(url, key):
+    """Per-model latency estimates from stored response times, refreshed every 10 minutes"""
+    return LatencyEstimator.from_supabase(get_supabase_client(url, key))
+
+@st.cache_data(ttl=300, show_spinner=False)
+def load_prompt_responses(_client, prompt_id):
+    """Stored responses for a prompt"""
+    return _client.table("model_responses").select("*").eq("prompt_id", prompt_id).execute().data
+
+def render_similar_prompts(similar):
+    """List near-duplicate prompts with their responses and offer to reuse them"""
+    with st.expander(f"🔁 {len(similar)} similar prompt(s) already asked", expanded=True):
+        for similar_id, similarity in similar:
+            st.markdown(f"**{similarity:.0%} similar:** {cluster_index.texts[similar_id]}")
+            
+            stored_responses = load_prompt_responses(supabase, similar_id)
+            for resp in stored_responses:
+                if resp['response_error']:
+                    st.caption(f"🔹 {resp['model_name']}: ❌ {resp['response_error']}")
+                else:
+                    content = resp['response_content']
+                    preview = content[:200] + "..." if len(content) > 200 else content
+                    st.caption(f"🔹 {resp['model_name']}: {preview}")
+            
+            if stored_responses and st.button("♻️ Reuse these responses", key=f"reuse_{similar_id}"):
+                st.session_state.current_responses = {
+                    resp['model_name']: {
+                        'id': resp['id'],
+                        'content': resp['response_content'],
+                        'error': resp['response_error']
+                    }
+                    for resp in stored_responses
+                }
+                st.session_state.current_prompt_id = similar_id
+            
+            st.divider()
 
 st.sidebar.header("User Info")
 username = st.sidebar.text_input("👤 Username (optional)", placeholder="Enter your name")
@@ -62,6 +113,14 @@ prompt = st.text_area(
     placeholder="Type your question or prompt here..."
 )
 
+cluster_index = get_prompt_cluster_index(supabase_url, supabase_key)
+
+if prompt.strip():
+    # The prompt just submitted is in the index now; don't offer it back to itself
+    similar = cluster_index.query(prompt, limit=3, exclude=st.session_state.get('current_prompt_id'))
+    if similar:
+        render_similar_prompts(similar)
+
 if st.button("🚀 Get Responses", type="primary"):
     if not prompt.strip():
         st.error("Please enter a prompt.")
@@ -80,15 +139,22 @@ if st.button("🚀 Get Responses", type="primary"):
             
             prompt_result = supabase.table("prompts").insert(prompt_data).execute()
             prompt_id = prompt_result.data[0]["id"]
+            cluster_index.add(prompt_id, prompt)
             
-            # Get responses from models with timing
+            # Every selected model gets its own worker, so submission order cannot change the wait;
+            # the estimator only predicts it (the slowest model) for comparison with the actual time
+            estimator = get_latency_estimator(supabase_url, supabase_key)
+            predicted_ms = estimator.predict_makespan(selected_models, len(selected_models))
+            timings = {}
             start_time = time.time()
-            responses = get_responses_from_models(selected_models, prompt, api_key)
+            responses = get_responses_from_models(selected_models, prompt, api_key, timings=timings)
+            actual_ms = int((time.time() - start_time) * 1000)
             
             # Store each model response in database and collect response IDs
             response_records = {}
             for model_name, response in responses.items():
-                response_time = int((time.time() - start_time) * 1000 / len(responses))
+                response_time = timings[model_name]
+                estimator.observe(model_name, response_time)
                 
                 if isinstance(response, str) and response.startswith("Error:"):
                     response_data = {
@@ -123,6 +189,7 @@ if st.button("🚀 Get Responses", type="primary"):
             supabase.table("prompts").update({"status": "completed"}).eq("id", prompt_id).execute()
             
             st.success(f"✅ Got responses from {len(responses)} models and saved to database!")
+            st.caption(f"⏱️ Predicted {predicted_ms / 1000:.1f}s, took {actual_ms / 1000:.1f}s")
             
         except Exception as e:
             # Update prompt status to failed if something went wrong
@@ -130,77 +197,75 @@ if st.button("🚀 Get Responses", type="primary"):
                 supabase.table("prompts").update({"status": "failed"}).eq("id", prompt_id).execute()
             st.error(f"An error occurred: {str(e)}")
 
-# Display responses with feedback forms
-if 'current_responses' in st.session_state and st.session_state.current_responses:
+def get_feedback_data(response_records):
+    """Collect feedback widget values for every response from session state"""
+    feedback_data = {}
+    for i, (model_name, record) in enumerate(response_records.items()):
+        feedback_text = st.session_state.get(f"feedback_{model_name}_{i}") or ""
+        feedback_data[model_name] = {
+            'response_id': record['id'],
+            'rating': st.session_state.get(f"rating_{model_name}_{i}"),
+            'feedback_text': feedback_text.strip() if feedback_text.strip() else None,
+            'rank': st.session_state.get(f"rank_{model_name}_{i}")
+        }
+    return feedback_data
+
+@st.fragment
+def render_response_card(model_name, record, i, num_responses):
+    """Show one model response with its feedback widgets; reruns on its own"""
+    st.subheader(f"🔹 {model_name}")
+    
+    # Display response content
+    if record['error']:
+        st.error(record['error'])
+    else:
+        st.write(record['content'])
+    
     st.markdown("---")
-    st.subheader("📝 Model Responses & Feedback")
     
-    response_records = st.session_state.current_responses
-    prompt_id = st.session_state.current_prompt_id
+    # Feedback form
+    st.markdown(f"**Rate {model_name}:**")
     
-    # Create columns for responses
-    num_responses = len(response_records)
-    cols = st.columns(min(num_responses, 3))
+    # Star rating
+    st.selectbox(
+        "⭐ Rating (1-5 stars)",
+        options=[None, 1, 2, 3, 4, 5],
+        format_func=lambda x: "Select rating..." if x is None else f"{'⭐' * x} ({x}/5)",
+        key=f"rating_{model_name}_{i}"
+    )
     
-    feedback_data = {}
+    # Text feedback
+    st.text_area(
+        "💬 Feedback (optional)",
+        placeholder="Enter your thoughts about this response...",
+        key=f"feedback_{model_name}_{i}",
+        height=100
+    )
     
-    for i, (model_name, record) in enumerate(response_records.items()):
-        col_index = i % len(cols)
-        
-        with cols[col_index]:
-            st.subheader(f"🔹 {model_name}")
-            
-            # Display response content
-            if record['error']:
-                st.error(record['error'])
-            else:
-                st.write(record['content'])
-            
-            st.markdown("---")
-            
-            # Feedback form
-            st.markdown(f"**Rate {model_name}:**")
-            
-            # Star rating
-            rating = st.selectbox(
-                "⭐ Rating (1-5 stars)",
-                options=[None, 1, 2, 3, 4, 5],
-                format_func=lambda x: "Select rating..." if x is None else f"{'⭐' * x} ({x}/5)",
-                key=f"rating_{model_name}_{i}"
-            )
-            
-            # Text feedback
-            feedback_text = st.text_area(
-                "💬 Feedback (optional)",
-                placeholder="Enter your thoughts about this response...",
-                key=f"feedback_{model_name}_{i}",
-                height=100
-            )
-            
-            # Ranking
-            rank = st.selectbox(
-                "🏆 Rank this response",
-                options=[None] + list(range(1, num_responses + 1)),
-                format_func=lambda x: "Select rank..." if x is None else f"#{x} {'🥇' if x == 1 else '🥈' if x == 2 else '🥉' if x == 3 else ''}",
-                key=f"rank_{model_name}_{i}"
-            )
-            
-            # Store feedback data for submission
-            feedback_data[model_name] = {
-                'response_id': record['id'],
-                'rating': rating,
-                'feedback_text': feedback_text.strip() if feedback_text.strip() else None,
-                'rank': rank
-            }
-            
-            st.divider()
+    # Ranking
+    st.selectbox(
+        "🏆 Rank this response",
+        options=[None] + list(range(1, num_responses + 1)),
+        format_func=lambda x: "Select rank..." if x is None else f"#{x} {'🥇' if x == 1 else '🥈' if x == 2 else '🥉' if x == 3 else ''}",
+        key=f"rank_{model_name}_{i}"
+    )
     
-    # Submit feedback button
+    st.divider()
+
+@st.fragment
+def render_feedback_submit(response_records, prompt_id):
+    """Submit button for all feedback; widget values are read from session state"""
     col1, col2, col3 = st.columns([1, 2, 1])
     with col2:
+        # Shown after the app-wide rerun that follows a successful submit
+        if st.session_state.pop('feedback_saved', False):
+            st.success("✅ Feedback submitted successfully!")
+            st.balloons()
+        
         if st.button("💾 Submit All Feedback", type="primary", use_container_width=True):
             try:
                 feedback_submitted = False
+                feedback_data = get_feedback_data(response_records)
                 
                 for model_name, feedback in feedback_data.items():
                     # Only submit if user provided any feedback
@@ -234,22 +299,36 @@ if 'current_responses' in st.session_state and st.session_state.current_response
                         feedback_submitted = True
                 
                 if feedback_submitted:
-                    st.success("✅ Feedback submitted successfully!")
-                    st.balloons()
+                    # New ratings change the summary view
+                    load_ratings_summary.clear()
+                    st.session_state.feedback_saved = True
                 else:
                     st.warning("⚠️ No feedback provided. Please rate, comment, or rank at least one response.")
                     
             except Exception as e:
                 st.error(f"Error submitting feedback: {str(e)}")
-    
-    # Analytics section
-    st.markdown("---")
+            
+            # A fragment rerun alone would leave an open analytics panel showing the old ratings
+            if st.session_state.get('feedback_saved'):
+                st.rerun(scope="app")
+
+@st.cache_data(ttl=60, show_spinner=False)
+def load_ratings_summary(_client):
+    """Fetch the ratings summary view (cached for a minute)"""
+    return _client.table("response_ratings_summary").select("*").execute().data
+
+@st.fragment
+def render_analytics():
+    """Analytics panel; reruns independently of the response cards"""
     with st.expander("📊 Model Performance Analytics", expanded=False):
+        if st.button("🔄 Refresh analytics"):
+            load_ratings_summary.clear()
+        
         try:
-            analytics = supabase.table("response_ratings_summary").select("*").execute()
-            if analytics.data:
+            analytics_data = load_ratings_summary(supabase)
+            if analytics_data:
                 import pandas as pd
-                df = pd.DataFrame(analytics.data)
+                df = pd.DataFrame(analytics_data)
                 df = df.sort_values('avg_rating', ascending=False)
                 st.dataframe(df, use_container_width=True)
             else:
@@ -257,6 +336,31 @@ if 'current_responses' in st.session_state and st.session_state.current_response
         except Exception as e:
             st.error(f"Error loading analytics: {str(e)}")
 
+# Display responses with feedback forms
+if 'current_responses' in st.session_state and st.session_state.current_responses:
+    st.markdown("---")
+    st.subheader("📝 Model Responses & Feedback")
+    
+    response_records = st.session_state.current_responses
+    prompt_id = st.session_state.current_prompt_id
+    
+    # Create columns for responses
+    num_responses = len(response_records)
+    cols = st.columns(min(num_responses, 3))
+    
+    # Each card is its own fragment, so a widget change only redraws that card
+    for i, (model_name, record) in enumerate(response_records.items()):
+        col_index = i % len(cols)
+        
+        with cols[col_index]:
+            render_response_card(model_name, record, i, num_responses)
+    
+    render_feedback_submit(response_records, prompt_id)
+    
+    # Analytics section
+    st.markdown("---")
+    render_analytics()
+
 st.sidebar.markdown("---")
 st.sidebar.markdown("**Instructions:**")
 st.sidebar.markdown("1. Enter username (optional)")
@@ -12,9 +12,10 @@ model_list = proprietary_models + open_source_models
 # api_key = os.getenv("OPENROUTER_API_KEY")
 
 import asyncio
+import time
 from concurrent.futures import ThreadPoolExecutor
 
-def get_responses_from_models(model_list, prompt, api_key):
+def get_responses_from_models(model_list, prompt, api_key, timings=None):
     """
     Get responses from multiple models for a given prompt concurrently.
     
@@ -22,11 +23,13 @@ def get_responses_from_models(model_list, prompt, api_key):
         model_list: List of model names to query
         prompt: The prompt to send to all models
         api_key: API key for OpenRouter
+        timings: Optional dict filled with each model's own response time in ms
     
     Returns:
         Dictionary with model names as keys and responses as values
     """
     def query_single_model(model_name):
+        start_time = time.time()
         try:
             model = ChatOpenAI(
                 model=model_name,
@@ -39,10 +42,13 @@ def get_responses_from_models(model_list, prompt, api_key):
             )
             
             response = model.invoke(prompt)
-            return model_name, response
             
         except Exception as e:
-            return model_name, f"Error: {str(e)}"
+            response = f"Error: {str(e)}"
+        
+        if timings is not None:
+            timings[model_name] = int((time.time() - start_time) * 1000)
+        return model_name, response
     
     responses = {}
     
@@ -56,6 +62,3 @@ def get_responses_from_models(model_list, prompt, api_key):
             responses[model_name] = response
     
     return responses
-
-
-
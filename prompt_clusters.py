@@ -0,0 +1,194 @@
+"""
+Prompt Clusters - MinHash/LSH index for grouping near-duplicate prompts
+"""
+
+import hashlib
+import random
+import re
+import threading
+
+MERSENNE_PRIME = (1 << 61) - 1
+SHINGLE_SIZE = 5
+PAGE_SIZE = 1000
+
+
+def _shingles(text):
+    """Character 5-grams of lowercased, whitespace-normalized text"""
+    normalized = " ".join(re.findall(r"\w+", text.lower()))
+    if len(normalized) <= SHINGLE_SIZE:
+        return {normalized} if normalized else set()
+    return {normalized[i:i + SHINGLE_SIZE] for i in range(len(normalized) - SHINGLE_SIZE + 1)}
+
+
+def _base_hash(shingle):
+    return int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), "little") % MERSENNE_PRIME
+
+
+class PromptClusterIndex:
+    def __init__(self, num_perm=64, bands=16, threshold=0.5, seed=314):
+        """MinHash signatures split into LSH bands; prompts whose estimated
+        Jaccard similarity reaches the threshold end up in the same cluster.
+
+        With 16 bands of 4 rows, pairs around 0.5 similarity become candidates
+        about half the time and pairs above 0.7 almost always do.
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+
+        rng = random.Random(seed)
+        self._perms = [(rng.randrange(1, MERSENNE_PRIME), rng.randrange(0, MERSENNE_PRIME)) for _ in range(num_perm)]
+
+        self.signatures = {}
+        self.texts = {}
+        self._buckets = [{} for _ in range(bands)]
+        self._parent = {}
+        self._lock = threading.Lock()
+
+    def signature(self, text):
+        """MinHash signature of a prompt"""
+        hashes = [_base_hash(s) for s in _shingles(text)]
+        if not hashes:
+            return None
+        return tuple(min([(a * h + b) % MERSENNE_PRIME for h in hashes]) for a, b in self._perms)
+
+    def _band_keys(self, signature):
+        return [signature[i * self.rows:(i + 1) * self.rows] for i in range(self.bands)]
+
+    def _similarity(self, sig_a, sig_b):
+        return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / self.num_perm
+
+    def _find(self, prompt_id):
+        root = prompt_id
+        while self._parent[root] != root:
+            root = self._parent[root]
+        # Path compression
+        while self._parent[prompt_id] != root:
+            next_id = self._parent[prompt_id]
+            self._parent[prompt_id] = root
+            prompt_id = next_id
+        return root
+
+    def _union(self, a, b):
+        root_a, root_b = self._find(a), self._find(b)
+        if root_a != root_b:
+            self._parent[root_b] = root_a
+
+    def _candidates(self, signature):
+        candidates = set()
+        for band, key in enumerate(self._band_keys(signature)):
+            candidates.update(self._buckets[band].get(key, ()))
+        return candidates
+
+    def query(self, text, limit=5, exclude=None):
+        """Indexed prompts similar to text, as (prompt_id, similarity) best first"""
+        signature = self.signature(text)
+        if signature is None:
+            return []
+        return self._query_signature(signature, limit, exclude)
+
+    def _query_signature(self, signature, limit=None, exclude=None):
+        matches = []
+        for candidate in self._candidates(signature):
+            if candidate == exclude:
+                continue
+            similarity = self._similarity(signature, self.signatures[candidate])
+            if similarity >= self.threshold:
+                matches.append((candidate, similarity))
+
+        matches.sort(key=lambda m: m[1], reverse=True)
+        return matches[:limit]
+
+    def add(self, prompt_id, text):
+        """Index a prompt and merge it into the cluster of its near-duplicates
+
+        Only prompts sharing an LSH bucket are compared, so an insert costs
+        the number of bands plus the (small) candidate set, not the corpus size.
+        Returns the prompt's cluster ID.
+        """
+        signature = self.signature(text)
+
+        # The app shares one index across sessions
+        with self._lock:
+            if prompt_id in self._parent:
+                return self._find(prompt_id)
+
+            self._parent[prompt_id] = prompt_id
+            if signature is None:
+                return prompt_id
+
+            for candidate, _ in self._query_signature(signature):
+                self._union(candidate, prompt_id)
+
+            self.signatures[prompt_id] = signature
+            self.texts[prompt_id] = text
+            for band, key in enumerate(self._band_keys(signature)):
+                self._buckets[band].setdefault(key, []).append(prompt_id)
+
+            return self._find(prompt_id)
+
+    def cluster_of(self, prompt_id):
+        """Cluster ID for an indexed prompt (the prompt's own ID if unknown)"""
+        if prompt_id not in self._parent:
+            return prompt_id
+        return self._find(prompt_id)
+
+    def clusters(self, min_size=1):
+        """Map of cluster ID to member prompt IDs"""
+        groups = {}
+        for prompt_id in self._parent:
+            groups.setdefault(self._find(prompt_id), []).append(prompt_id)
+        return {cid: members for cid, members in groups.items() if len(members) >= min_size}
+
+
+def load_prompt_clusters(supabase, **index_kwargs):
+    """Build a cluster index from every prompt in the database"""
+    index = PromptClusterIndex(**index_kwargs)
+    offset = 0
+
+    while True:
+        result = supabase.table("prompts")\
+            .select("id, prompt_text")\
+            .order("created_at")\
+            .range(offset, offset + PAGE_SIZE - 1)\
+            .execute()
+
+        for row in result.data:
+            if row.get('prompt_text'):
+                index.add(row['id'], row['prompt_text'])
+
+        if len(result.data) < PAGE_SIZE:
+            break
+        offset += PAGE_SIZE
+
+    return index
+
+
+def aggregate_scores(rows, cluster_of=None):
+    """Average score per model, optionally counting each prompt cluster once
+
+    rows are dicts with prompt_id, model_name and score. With cluster_of,
+    scores are first averaged within each (cluster, model) pair so repeated
+    rewordings of one prompt do not outweigh distinct prompts.
+    """
+    groups = {}
+    for row in rows:
+        if row.get('score') is None:
+            continue
+        key = cluster_of(row['prompt_id']) if cluster_of else row['prompt_id']
+        groups.setdefault((row['model_name'], key), []).append(row['score'])
+
+    per_model = {}
+    for (model_name, _), scores in groups.items():
+        per_model.setdefault(model_name, []).append(sum(scores) / len(scores))
+
+    leaderboard = [
+        {'model_name': model_name, 'avg_score': round(sum(means) / len(means), 2), 'items': len(means)}
+        for model_name, means in per_model.items()
+    ]
+    leaderboard.sort(key=lambda r: r['avg_score'], reverse=True)
+    return leaderboard
@@ -7,6 +7,8 @@ from dotenv import load_dotenv
 from supabase import create_client, Client
 import json
 from datetime import datetime
+from search_index import SearchIndex, DEFAULT_INDEX_PATH
+from prompt_clusters import load_prompt_clusters, aggregate_scores, PAGE_SIZE
 
 load_dotenv()
 
@@ -200,6 +202,85 @@ class PromptInspector:
         except:
             return dt_string
     
+    def search(self, query, kind=None, limit=20, index_path=DEFAULT_INDEX_PATH, sync=True, rebuild=False):
+        """Full-text search over prompts, responses and evaluations"""
+        index = SearchIndex(self.supabase, index_path)
+        try:
+            if rebuild:
+                added = index.rebuild()
+                print(f"🧱 Rebuilt index: {added['prompt']} prompts, {added['response']} responses, {added['evaluation']} evaluations")
+            elif sync:
+                added = index.sync()
+                if any(added.values()):
+                    print(f"🔄 Indexed {added['prompt']} prompts, {added['response']} responses, {added['evaluation']} evaluations")
+            return index.search(query, kind=kind, limit=limit)
+        finally:
+            index.close()
+    
+    def display_search_results(self, query, results):
+        """Display ranked search hits"""
+        print(f"🔎 SEARCH RESULTS: {query}")
+        print("=" * 60)
+        
+        if not results:
+            print("No matches found.")
+            return
+        
+        kind_emoji = {'prompt': '💬', 'response': '🤖', 'evaluation': '🧠'}
+        for i, hit in enumerate(results, 1):
+            label = hit['kind'] if not hit['model_name'] else f"{hit['kind']} ({hit['model_name']})"
+            print(f"{i}. {kind_emoji.get(hit['kind'], '📄')} {label} | 📅 {self._format_datetime(hit['created_at'])}")
+            print(f"   🆔 Prompt ID: {hit['prompt_id']}")
+            print(f"   📝 {hit['snippet']}")
+            print()
+    
+    def show_leaderboard(self, by_cluster=False):
+        """Rank models by average judge overall score"""
+        rows = []
+        offset = 0
+        
+        # Paged, since PostgREST caps a single response (1000 rows by default)
+        while True:
+            result = self.supabase.table("llm_evaluations")\
+                .select("prompt_id, model_name, scores")\
+                .order("created_at")\
+                .range(offset, offset + PAGE_SIZE - 1)\
+                .execute()
+            
+            for eval_data in result.data:
+                if not eval_data['scores']:
+                    continue
+                scores = json.loads(eval_data['scores']) if isinstance(eval_data['scores'], str) else eval_data['scores']
+                rows.append({
+                    'prompt_id': eval_data['prompt_id'],
+                    'model_name': eval_data['model_name'],
+                    'score': scores.get('overall')
+                })
+            
+            if len(result.data) < PAGE_SIZE:
+                break
+            offset += PAGE_SIZE
+        
+        cluster_of = None
+        if by_cluster:
+            # Near-duplicate prompts count once per model, not once per rewording
+            cluster_index = load_prompt_clusters(self.supabase)
+            cluster_of = cluster_index.cluster_of
+            print(f"🧩 {len(cluster_index.clusters())} prompt clusters from {len(cluster_index.signatures)} prompts")
+        
+        leaderboard = aggregate_scores(rows, cluster_of)
+        
+        print("🏆 LEADERBOARD" + (" (by prompt cluster)" if by_cluster else ""))
+        print("=" * 60)
+        
+        if not leaderboard:
+            print("No scored evaluations yet.")
+            return
+        
+        unit = "clusters" if by_cluster else "prompts"
+        for i, entry in enumerate(leaderboard, 1):
+            print(f"{i}. {entry['model_name']}: {entry['avg_score']}/10 ({entry['items']} {unit})")
+    
     def list_recent_prompts(self, limit=10):
         """List recent prompts"""
         result = self.supabase.table("prompts")\
@@ -227,20 +308,40 @@ def main():
     parser.add_argument("--prompt-id", type=str, help="UUID of the prompt to inspect")
     parser.add_argument("--prompt-text", type=str, help="Text of the prompt to inspect")
     parser.add_argument("--list-recent", type=int, metavar="N", help="List N recent prompts (default: 10)")
+    parser.add_argument("--search", type=str, metavar="QUERY", help='Full-text search; use "quotes" for phrases')
+    parser.add_argument("--search-kind", choices=["prompt", "response", "evaluation"], help="Limit search to one kind of text")
+    parser.add_argument("--search-limit", type=int, default=20, help="Maximum search results (default: 20)")
+    parser.add_argument("--no-sync", action="store_true", help="Search the local index without pulling new rows first")
+    parser.add_argument("--rebuild-index", action="store_true", help="Drop the local search index and re-sync everything before searching")
+    parser.add_argument("--index-path", type=str, default=DEFAULT_INDEX_PATH, help="Path of the local search index")
+    parser.add_argument("--leaderboard", action="store_true", help="Rank models by average judge score")
+    parser.add_argument("--by-cluster", action="store_true", help="Count near-duplicate prompts once in the leaderboard")
     
     args = parser.parse_args()
     
     try:
         inspector = PromptInspector()
         
-        if args.list_recent is not None:
+        if args.leaderboard:
+            inspector.show_leaderboard(by_cluster=args.by_cluster)
+        elif args.search:
+            results = inspector.search(
+                args.search,
+                kind=args.search_kind,
+                limit=args.search_limit,
+                index_path=args.index_path,
+                sync=not args.no_sync,
+                rebuild=args.rebuild_index
+            )
+            inspector.display_search_results(args.search, results)
+        elif args.list_recent is not None:
             limit = args.list_recent if args.list_recent > 0 else 10
             inspector.list_recent_prompts(limit)
         elif args.prompt_id or args.prompt_text:
             info = inspector.get_prompt_info(prompt_id=args.prompt_id, prompt_text=args.prompt_text)
             inspector.display_prompt_info(info)
         else:
-            print("❌ Please provide --prompt-id, --prompt-text, or --list-recent")
+            print("❌ Please provide --prompt-id, --prompt-text, --search, --leaderboard, or --list-recent")
             
     except Exception as e:
         print(f"❌ Error: {e}")
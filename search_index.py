@@ -0,0 +1,221 @@
+"""
+Search Index - Local SQLite FTS5 index over prompts, responses and evaluations
+"""
+
+import os
+import re
+import sqlite3
+
+DEFAULT_INDEX_PATH = os.getenv(
+    "TUTORBENCH_INDEX_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "tutorbench_index.db")
+)
+
+# Source table, document kind and the column holding its searchable text
+SOURCES = {
+    'prompt': ('prompts', 'prompt_text'),
+    'response': ('model_responses', 'response_content'),
+    'evaluation': ('llm_evaluations', 'evaluation_text')
+}
+
+PAGE_SIZE = 500
+
+# Kinds whose source rows get deleted (the evaluation worker rewrites a prompt's
+# evaluations), so each sync also drops index entries that no longer exist
+PRUNE_KINDS = ('evaluation',)
+
+
+class SearchIndex:
+    def __init__(self, supabase, index_path=DEFAULT_INDEX_PATH):
+        self.supabase = supabase
+        self.index_path = index_path
+        self.conn = sqlite3.connect(index_path)
+        self._create_schema()
+
+    def _create_schema(self):
+        """Create the FTS table and sync bookkeeping if missing"""
+        self.conn.executescript("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS documents USING fts5(
+                content,
+                kind UNINDEXED,
+                row_id UNINDEXED,
+                prompt_id UNINDEXED,
+                model_name UNINDEXED,
+                created_at UNINDEXED,
+                tokenize = 'porter unicode61'
+            );
+            CREATE TABLE IF NOT EXISTS document_keys (
+                kind TEXT NOT NULL,
+                row_id TEXT NOT NULL,
+                doc_rowid INTEGER NOT NULL,
+                PRIMARY KEY (kind, row_id)
+            );
+            CREATE TABLE IF NOT EXISTS sync_state (
+                kind TEXT PRIMARY KEY,
+                last_created_at TEXT
+            );
+        """)
+        self.conn.commit()
+
+    def _get_last_synced(self, kind):
+        row = self.conn.execute("SELECT last_created_at FROM sync_state WHERE kind = ?", (kind,)).fetchone()
+        return row[0] if row else None
+
+    def add_rows(self, kind, rows):
+        """Insert or replace rows of one kind in the index, returning how many were new"""
+        text_column = SOURCES[kind][1]
+        count = 0
+
+        for row in rows:
+            text = row.get(text_column)
+            if not text:
+                continue
+
+            # Rows are keyed by their source ID, so re-adding a row replaces it
+            existing = self.conn.execute(
+                "SELECT doc_rowid FROM document_keys WHERE kind = ? AND row_id = ?", (kind, str(row['id']))
+            ).fetchone()
+            if existing:
+                self.conn.execute("DELETE FROM documents WHERE rowid = ?", existing)
+
+            cursor = self.conn.execute(
+                "INSERT INTO documents (content, kind, row_id, prompt_id, model_name, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    text,
+                    kind,
+                    str(row['id']),
+                    str(row['id'] if kind == 'prompt' else row.get('prompt_id')),
+                    row.get('model_name'),
+                    row.get('created_at')
+                )
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO document_keys (kind, row_id, doc_rowid) VALUES (?, ?, ?)",
+                (kind, str(row['id']), cursor.lastrowid)
+            )
+            if not existing:
+                count += 1
+
+        self.conn.commit()
+        return count
+
+    def sync(self):
+        """Pull rows created since the last sync into the index, then prune PRUNE_KINDS
+
+        Returns a dict of newly indexed row counts per kind.
+        """
+        added = {}
+
+        for kind, (table, text_column) in SOURCES.items():
+            last_synced = self._get_last_synced(kind)
+            added[kind] = 0
+            offset = 0
+
+            while True:
+                columns = f"id, {text_column}, created_at" + ("" if kind == 'prompt' else ", prompt_id, model_name")
+                query = self.supabase.table(table).select(columns)
+                if last_synced:
+                    # gte rather than gt so rows sharing the boundary timestamp are not lost
+                    query = query.gte("created_at", last_synced)
+                result = query.order("created_at").range(offset, offset + PAGE_SIZE - 1).execute()
+
+                if not result.data:
+                    break
+
+                added[kind] += self.add_rows(kind, result.data)
+                newest = result.data[-1]['created_at']
+                self.conn.execute(
+                    "INSERT INTO sync_state (kind, last_created_at) VALUES (?, ?) "
+                    "ON CONFLICT(kind) DO UPDATE SET last_created_at = excluded.last_created_at",
+                    (kind, newest)
+                )
+                self.conn.commit()
+
+                if len(result.data) < PAGE_SIZE:
+                    break
+                offset += PAGE_SIZE
+
+        self.prune(PRUNE_KINDS)
+        return added
+
+    def prune(self, kinds=None):
+        """Remove indexed rows whose source row has been deleted
+
+        Only source IDs are fetched, compared against the indexed row_ids per kind.
+        Returns a dict of removed row counts per kind.
+        """
+        removed = {}
+
+        for kind in kinds or SOURCES:
+            table = SOURCES[kind][0]
+            source_ids = set()
+            offset = 0
+
+            while True:
+                result = self.supabase.table(table).select("id").order("created_at")\
+                    .range(offset, offset + PAGE_SIZE - 1).execute()
+                source_ids.update(str(row['id']) for row in result.data)
+                if len(result.data) < PAGE_SIZE:
+                    break
+                offset += PAGE_SIZE
+
+            stale = [
+                (row_id, doc_rowid)
+                for row_id, doc_rowid in self.conn.execute(
+                    "SELECT row_id, doc_rowid FROM document_keys WHERE kind = ?", (kind,)
+                ).fetchall()
+                if row_id not in source_ids
+            ]
+            for row_id, doc_rowid in stale:
+                self.conn.execute("DELETE FROM documents WHERE rowid = ?", (doc_rowid,))
+                self.conn.execute("DELETE FROM document_keys WHERE kind = ? AND row_id = ?", (kind, row_id))
+            self.conn.commit()
+            removed[kind] = len(stale)
+
+        return removed
+
+    def rebuild(self):
+        """Drop everything indexed and sync from scratch"""
+        self.conn.executescript("""
+            DELETE FROM documents;
+            DELETE FROM document_keys;
+            DELETE FROM sync_state;
+        """)
+        self.conn.commit()
+        return self.sync()
+
+    def _to_match_query(self, query):
+        """Turn user input into an FTS5 query: quoted phrases kept, other words quoted as terms"""
+        terms = re.findall(r'"[^"]+"|\S+', query)
+        match_terms = []
+        for term in terms:
+            term = term.strip('"').replace('"', '""')
+            if term:
+                match_terms.append(f'"{term}"')
+        return " ".join(match_terms)
+
+    def search(self, query, kind=None, limit=20):
+        """Ranked keyword/phrase search, best matches first"""
+        match_query = self._to_match_query(query)
+        if not match_query:
+            return []
+
+        sql = """
+            SELECT kind, row_id, prompt_id, model_name, created_at,
+                   snippet(documents, 0, '[', ']', '...', 16) AS snippet,
+                   bm25(documents) AS rank
+            FROM documents
+            WHERE documents MATCH ?
+        """
+        params = [match_query]
+        if kind:
+            sql += " AND kind = ?"
+            params.append(kind)
+        sql += " ORDER BY rank LIMIT ?"
+        params.append(limit)
+
+        columns = ['kind', 'row_id', 'prompt_id', 'model_name', 'created_at', 'snippet', 'rank']
+        return [dict(zip(columns, row)) for row in self.conn.execute(sql, params).fetchall()]
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,275 @@
+"""
+Tutoring Sessions - Multi-turn simulated student vs tutor conversations
+
+Transcripts are stored in a tutoring_sessions table:
+
+    CREATE TABLE tutoring_sessions (
+        id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+        created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        scenario TEXT NOT NULL,
+        tutor_model TEXT NOT NULL,
+        student_model TEXT NOT NULL,
+        transcript JSONB NOT NULL,            -- [{role, content, latency_ms}, ...]
+        total_time_ms INTEGER,
+        status TEXT NOT NULL,                 -- completed / failed
+        error TEXT,
+        evaluation_text TEXT,
+        scores JSONB,
+        judge_model TEXT
+    );
+"""
+
+import os
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dotenv import load_dotenv
+from langchain_openai import ChatOpenAI
+from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
+from supabase import create_client, Client
+from llm_evaluator import JUDGE_MODEL
+
+load_dotenv()
+
+DONE_MARKER = "[DONE]"
+
+SCENARIOS = {
+    'frustrated': {
+        'description': "A frustrated high-school student stuck on solving linear equations who wants to give up",
+        'persona': (
+            "You are a 15-year-old student who has been stuck on solving linear equations like 3x + 5 = 20 for an hour. "
+            "You are frustrated, a bit rude, and keep saying you are bad at math. You only calm down if the tutor "
+            "acknowledges how you feel and breaks the problem into small steps you can do yourself."
+        ),
+        'opening': "ugh I've been doing 3x + 5 = 20 forever and I still don't get it. math is stupid. just tell me the answer"
+    },
+    'confused': {
+        'description': "A confused student who mixes up mass and weight when learning about gravity",
+        'persona': (
+            "You are a 13-year-old student learning about gravity. You genuinely believe mass and weight are the same "
+            "thing, so you think an astronaut's mass changes on the Moon. You ask hesitant questions and get more "
+            "confused by jargon, but you follow along with concrete examples."
+        ),
+        'opening': "so if I go to the moon I'd weigh less, which means my mass goes down too right? I'm kind of lost"
+    },
+    'overconfident': {
+        'description': "An overconfident student who is sure heavier objects fall faster",
+        'persona': (
+            "You are a 16-year-old student who is certain that heavier objects always fall faster than lighter ones, "
+            "and you push back when corrected. You only change your mind if the tutor gets you to reason through "
+            "an example or thought experiment yourself rather than just telling you that you are wrong."
+        ),
+        'opening': "a bowling ball obviously falls faster than a tennis ball because it's heavier. can you just confirm so I can finish my homework?"
+    }
+}
+
+
+class TutoringSessionRunner:
+    def __init__(self, student_model="x-ai/grok-4-fast:free", max_turns=4, max_workers=None):
+        self.api_key = os.getenv("OPENROUTER_API_KEY")
+        self.supabase_url = os.getenv("SUPABASE_URL")
+        self.supabase_key = os.getenv("SUPABASE_ANON_KEY")
+
+        if not all([self.api_key, self.supabase_url, self.supabase_key]):
+            raise ValueError("Missing required environment variables")
+
+        self.supabase: Client = create_client(self.supabase_url, self.supabase_key)
+        self.student_model = student_model
+        self.max_turns = max_turns
+        self.max_workers = max_workers
+
+    def _make_model(self, model_name):
+        return ChatOpenAI(
+            model=model_name,
+            openai_api_key=self.api_key,
+            openai_api_base="https://openrouter.ai/api/v1"
+        )
+
+    def _timed_invoke(self, model, messages):
+        """Invoke a model and return (content, latency in ms)"""
+        start_time = time.time()
+        response = model.invoke(messages)
+        return response.content, int((time.time() - start_time) * 1000)
+
+    def run_session(self, tutor_model, scenario_name):
+        """Run one conversation between the simulated student and a tutor model
+
+        Each session advances turn by turn on its own, so a slow tutor only
+        delays its own session.
+        """
+        scenario = SCENARIOS[scenario_name]
+        tutor = self._make_model(tutor_model)
+        student = self._make_model(self.student_model)
+
+        student_system = SystemMessage(content=(
+            f"{scenario['persona']}\n\n"
+            "Stay in character and reply as the student in one to three sentences. "
+            f"If you now genuinely understand and have nothing more to ask, end your reply with {DONE_MARKER}."
+        ))
+
+        transcript = [{'role': 'student', 'content': scenario['opening'], 'latency_ms': 0}]
+        status = 'completed'
+        error = None
+        start_time = time.time()
+
+        try:
+            for turn_number in range(1, self.max_turns + 1):
+                # The tutor sees the student as the user; the student sees the reverse
+                tutor_messages = [
+                    HumanMessage(content=turn['content']) if turn['role'] == 'student' else AIMessage(content=turn['content'])
+                    for turn in transcript
+                ]
+                tutor_reply, latency_ms = self._timed_invoke(tutor, tutor_messages)
+                transcript.append({'role': 'tutor', 'content': tutor_reply, 'latency_ms': latency_ms})
+
+                # The session ends on the tutor's last turn, not on a student reply nobody answers
+                if turn_number == self.max_turns:
+                    break
+
+                student_messages = [student_system] + [
+                    AIMessage(content=turn['content']) if turn['role'] == 'student' else HumanMessage(content=turn['content'])
+                    for turn in transcript
+                ]
+                student_reply, latency_ms = self._timed_invoke(student, student_messages)
+                finished = DONE_MARKER in student_reply
+                student_reply = student_reply.replace(DONE_MARKER, "").strip()
+                transcript.append({'role': 'student', 'content': student_reply, 'latency_ms': latency_ms})
+
+                if finished:
+                    break
+        except Exception as e:
+            status = 'failed'
+            error = str(e)
+
+        return {
+            'scenario': scenario_name,
+            'tutor_model': tutor_model,
+            'student_model': self.student_model,
+            'transcript': transcript,
+            'total_time_ms': int((time.time() - start_time) * 1000),
+            'status': status,
+            'error': error
+        }
+
+    def store_session(self, session):
+        """Store a session transcript with per-turn latencies"""
+        session_data = {
+            "scenario": session['scenario'],
+            "tutor_model": session['tutor_model'],
+            "student_model": session['student_model'],
+            "transcript": json.dumps(session['transcript']),
+            "total_time_ms": session['total_time_ms'],
+            "status": session['status'],
+            "error": session['error']
+        }
+
+        try:
+            result = self.supabase.table("tutoring_sessions").insert(session_data).execute()
+            return result.data[0]["id"]
+        except Exception as e:
+            print(f"Error storing session: {e}")
+            return None
+
+    def run_sessions(self, tutor_models, scenario_names):
+        """Run every (tutor, scenario) pair concurrently and store each as it finishes
+
+        By default every session gets its own worker, so no session waits in the
+        queue behind a slow tutor's conversation; max_workers caps that if set.
+        """
+        pairs = [(model, scenario) for scenario in scenario_names for model in tutor_models]
+        sessions = []
+        max_workers = min(self.max_workers, len(pairs)) if self.max_workers else len(pairs)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(self.run_session, model, scenario) for model, scenario in pairs]
+
+            for future in as_completed(futures):
+                session = future.result()
+                session['id'] = self.store_session(session)
+                sessions.append(session)
+
+                tutor_turns = [t for t in session['transcript'] if t['role'] == 'tutor']
+                status_emoji = "✅" if session['status'] == 'completed' else "❌"
+                print(f"  {status_emoji} {session['tutor_model']} / {session['scenario']}: "
+                      f"{len(tutor_turns)} tutor turns in {session['total_time_ms']} ms (ID: {session['id']})")
+
+        return sessions
+
+    def judge_sessions(self, evaluator, sessions):
+        """Judge whole transcripts with an LLMEvaluator and store the results on each session"""
+        for session in sessions:
+            if session['status'] != 'completed':
+                continue
+
+            print(f"  📊 Judging {session['tutor_model']} / {session['scenario']}...")
+            evaluation = evaluator.evaluate_session(
+                SCENARIOS[session['scenario']]['description'],
+                session['tutor_model'],
+                session['transcript']
+            )
+            scores = evaluator.parse_evaluation_scores(evaluation)
+            if not evaluation.startswith("Error during"):
+                scores = evaluator.repair_missing_scores(evaluation, scores)
+            session['evaluation'] = evaluation
+            session['scores'] = scores
+
+            if session.get('id'):
+                try:
+                    self.supabase.table("tutoring_sessions").update({
+                        "evaluation_text": evaluation,
+                        "scores": json.dumps(scores) if scores else None,
+                        "judge_model": JUDGE_MODEL
+                    }).eq("id", session['id']).execute()
+                except Exception as e:
+                    print(f"Error storing session evaluation: {e}")
+
+
+def main():
+    """Command line interface for simulated tutoring sessions"""
+    import argparse
+    from model_use import model_list
+
+    parser = argparse.ArgumentParser(description="Run multi-turn simulated tutoring sessions")
+    parser.add_argument("--models", nargs="+", default=model_list, help="Tutor models to test (default: all)")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS), help="Scenarios to run (default: all)")
+    parser.add_argument("--student-model", type=str, default="x-ai/grok-4-fast:free", help="Model playing the student")
+    parser.add_argument("--turns", type=int, default=4, help="Maximum tutor turns per session (default: 4)")
+    parser.add_argument("--workers", type=int, help="Cap on sessions running concurrently (default: all at once)")
+    parser.add_argument("--judge", action="store_true", help="Judge each completed transcript")
+
+    args = parser.parse_args()
+
+    try:
+        runner = TutoringSessionRunner(
+            student_model=args.student_model,
+            max_turns=args.turns,
+            max_workers=args.workers
+        )
+
+        print(f"🎭 Running {len(args.models) * len(args.scenarios)} tutoring sessions...")
+        sessions = runner.run_sessions(args.models, args.scenarios)
+
+        if args.judge:
+            from llm_evaluator import LLMEvaluator
+            print("🔍 Judging transcripts...")
+            runner.judge_sessions(LLMEvaluator(), sessions)
+
+        print("\n" + "="*50)
+        print("📋 SESSION SUMMARY")
+        print("="*50)
+
+        for session in sessions:
+            tutor_latencies = [t['latency_ms'] for t in session['transcript'] if t['role'] == 'tutor']
+            print(f"\n🤖 {session['tutor_model']} / {session['scenario']}")
+            print(f"   Status: {session['status']}" + (f" ({session['error']})" if session['error'] else ""))
+            if tutor_latencies:
+                print(f"   Tutor turns: {len(tutor_latencies)} | Avg latency: {sum(tutor_latencies) // len(tutor_latencies)} ms")
+            if session.get('scores'):
+                print(f"   Overall Score: {session['scores'].get('overall', 'N/A')}/10")
+
+    except Exception as e:
+        print(f"❌ Error: {e}")
+
+
+if __name__ == "__main__":
+    main()